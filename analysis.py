@@ -1,30 +1,42 @@
-from sentence_transformers import SentenceTransformer, util
-from deep_translator import GoogleTranslator
-from fpdf import FPDF
+import argparse
 import pandas as pd
-import numpy as np
-import re
-import matplotlib.pyplt as plt
+from pathlib import Path
 
+from src.config import EMBEDDING_CACHE_DIR
+from src.embeddings import EmbeddingCache, clean_text, model_id
+from src.metrics import METRICS
+from src.storage import load_table
+from src.translation import Translator
+
+AI_TRENDS_TEXT = """
+            AI supply chain, sustainability, ethics, bias, digital colonialism, surveillance, privacy,
+            student-focused AI tools, plagiarism detection,
+            AI-generated learning materials, Learning Management Systems, scheduling optimization,
+            healthcare diagnostics, predictive analytics, fraud detection, robo-advisors, Large Language Models, Natural Language Processing,
+            machine learning
+            computer vision, deep learning, chatbots, content generation, autonomous vehicles, smart mobility,
+            generative AI for media, AI in manufacturing, cobots, predictive maintenance, digital twins,
+            personalized recommendations, immersive media, Explainable AI, algorithmic decision-making, robotics,.
+        """
+COVERAGE_THRESHOLD = 0.3
+
+# The only columns the analysis reads, the raw markdown is never needed
+ANALYSIS_COLUMNS = ["name", "Naam opleiding", "summary", "Toelichting", "Sleuteltechnologiecategorie (0–3)"]
+
+@METRICS.span("load_and_preprocess_data")
 def load_and_preprocess_data(filepath, ai_trends_text):
-    # Load CSV
-    df_courses = pd.read_csv(filepath)
+    # Load CSV or catalog
+    df_courses = load_table(filepath, ANALYSIS_COLUMNS)
 
     # Translate 'Toelichting' column if 'summary' doesn't exist
     if "summary" not in df_courses.columns:
-        translator = GoogleTranslator(source='nl', target='en')
-        df_courses["description"] = df_courses["Toelichting"].astype(str).apply(
-            lambda text: translator.translate(text) if pd.notnull(text) else ""
-        )
+        # Deduplicated, batched and cached, unchanged rows cost no calls
+        translator = Translator(source='nl', target='en')
+        df_courses["description"] = translator.translate(df_courses["Toelichting"].tolist())
         df_courses.rename(columns={"description": "summary"}, inplace=True)
 
     # Clean up the text
-    def preprocess(text):
-        text = re.sub(r"\*\*.*?\*\*", "", text)  # remove markdown bold
-        text = re.sub(r"\s+", " ", text)  # normalize whitespace
-        return text.lower()
-
-    df_courses["clean"] = df_courses["summary"].astype(str).apply(preprocess)
+    df_courses["clean"] = df_courses["summary"].astype(str).apply(clean_text)
 
     # Filter out courses with Sleuteltechnologiecategorie == 0 if the column exists
     if "Sleuteltechnologiecategorie (0-3)" in df_courses.columns:
@@ -36,37 +48,61 @@ def load_and_preprocess_data(filepath, ai_trends_text):
 
     # Prepare AI trend list
     ai_trend_list = [trend.strip() for trend in ai_trends_text.strip().split(",")]
-    ai_trend_list_clean = [preprocess(trend) for trend in ai_trend_list]
+    ai_trend_list_clean = [clean_text(trend) for trend in ai_trend_list]
 
     return df_courses, ai_trend_list, ai_trend_list_clean
 
-def compute_similarity(df_courses, ai_trend_list_clean, coverage_threshold=0.3):
-    model = SentenceTransformer('all-MiniLM-L6-v2')
-
-    # Encode AI trends and course descriptions
-    trend_embeddings = model.encode(ai_trend_list_clean, convert_to_tensor=True)
-    course_embeddings = model.encode(df_courses["clean"].tolist(), convert_to_tensor=True)
-
-    # Compute similarity matrix
-    similarity_matrix = util.cos_sim(course_embeddings, trend_embeddings).cpu().numpy()
-    df_courses["ai_trend_similarity"] = similarity_matrix.max(axis=1)
+@METRICS.span("compute_similarity")
+def compute_similarity(df_courses, ai_trend_list_clean, coverage_threshold=0.3, cache_dir=EMBEDDING_CACHE_DIR, pooling=None, workers=1, model=None):
+    """
+    With ``pooling`` set to "max" or "mean" long descriptions are split into
+    passages, encoded length-bucketed over ``workers`` processes and pooled
+    back per course; otherwise each description is encoded as a whole.
+    ``model`` is a model id (see ``model_id``), by default the configured one.
+    """
+    from src.encoding import PassageEncoder, mean_pool, split_passages
+    from src.scoring import iter_pooled_similarity_blocks, score, score_blocks
+
+    model = model or model_id()
+    cache = EmbeddingCache(cache_dir, model)
+    course_texts = df_courses["clean"].tolist()
+    if pooling is None:
+        owners = None
+    else:
+        course_texts, owners = split_passages(course_texts)
+
+    # Encode course descriptions and AI trends, reusing cached embeddings.
+    # The model is only loaded when the cache is missing some of the texts.
+    with METRICS.span("encode"), PassageEncoder(model, workers) as encode:
+        embeddings = cache.encode(course_texts + list(ai_trend_list_clean), encode)
+    course_embeddings = embeddings[:len(course_texts)]
+    trend_embeddings = embeddings[len(course_texts):]
+
+    # Score courses against trends in bounded-memory blocks
+    with METRICS.span("score"):
+        if pooling == "max":
+            blocks = iter_pooled_similarity_blocks(course_embeddings, owners, trend_embeddings)
+            scores = score_blocks(blocks, len(trend_embeddings), coverage_threshold)
+        else:
+            if pooling == "mean":
+                course_embeddings = mean_pool(course_embeddings, owners, len(df_courses))
+            scores = score(course_embeddings, trend_embeddings, coverage_threshold)
+    df_courses["ai_trend_similarity"] = scores.max_similarity
 
     # Determine covered trends per course
-    covered_trends_per_course = []
-    for course_similarities in similarity_matrix:
-        covered_trends = [ai_trend_list_clean[i] for i, score in enumerate(course_similarities) if score >= coverage_threshold]
-        covered_trends_per_course.append(covered_trends)
-
-    df_courses["covered_trends"] = covered_trends_per_course
+    df_courses["covered_trends"] = scores.covered_trends(ai_trend_list_clean)
 
     # Generate trend coverage matrix
-    trend_coverage_matrix = pd.DataFrame(similarity_matrix >= coverage_threshold,
-                                         columns=ai_trend_list_clean,
-                                         index=df_courses["name"])
-    return df_courses, trend_coverage_matrix, similarity_matrix
+    trend_coverage_matrix = scores.coverage_frame(ai_trend_list_clean, index=df_courses["name"])
+    return df_courses, trend_coverage_matrix, scores
+
+@METRICS.span("generate_report")
+def generate_report(df_courses, trend_coverage_matrix, ai_trend_list_clean, coverage_threshold=0.3, output_dir=Path(".")):
+    import matplotlib.pyplot as plt
+    from fpdf import FPDF
 
-def generate_report(df_courses, trend_coverage_matrix, ai_trend_list_clean, coverage_threshold=0.3):
-    trend_coverage_matrix.to_csv("trend_coverage_matrix.csv")
+    output_dir = Path(output_dir)
+    trend_coverage_matrix.to_csv(output_dir / "trend_coverage_matrix.csv")
 
     top_matches = df_courses.sort_values(by="ai_trend_similarity", ascending=False).head(10)
     covered_trends = set([trend for trends in df_courses["covered_trends"] for trend in trends])
@@ -88,7 +124,7 @@ def generate_report(df_courses, trend_coverage_matrix, ai_trend_list_clean, cove
     plt.legend()
     plt.grid(axis="y", linestyle="--", alpha=0.7)
     plt.tight_layout()
-    plt.savefig("histogram_embeddings.jpeg")
+    plt.savefig(output_dir / "histogram_embeddings.jpeg")
     plt.close()
 
     # === Generate report text ===
@@ -142,24 +178,22 @@ def generate_report(df_courses, trend_coverage_matrix, ai_trend_list_clean, cove
     pdf.add_page()
     clean_report = report.encode("latin-1", "replace").decode("latin-1")
     pdf.chapter_body(clean_report)
-    pdf.output("AI_Trends_Coverage_Report.pdf")
+    pdf.output(str(output_dir / "AI_Trends_Coverage_Report.pdf"))
 
-def main(filepath, ai_trends_text, coverage_threshold):
+def main(filepath, ai_trends_text, coverage_threshold, pooling=None, workers=1):
     df_courses, ai_trend_list, ai_trend_list_clean = load_and_preprocess_data(filepath, ai_trends_text)
-    df_courses, trend_coverage_matrix, similarity_matrix = compute_similarity(df_courses, ai_trend_list_clean, coverage_threshold)
+    cache_dir = EMBEDDING_CACHE_DIR / Path(filepath).stem
+    df_courses, trend_coverage_matrix, scores = compute_similarity(df_courses, ai_trend_list_clean, coverage_threshold, cache_dir, pooling, workers)
     generate_report(df_courses, trend_coverage_matrix, ai_trend_list, coverage_threshold)
+    METRICS.export("analysis")
 
 if __name__ == "__main__":
-    filepath = "minors.csv"
-    ai_trends_text = """
-            AI supply chain, sustainability, ethics, bias, digital colonialism, surveillance, privacy,
-            student-focused AI tools, plagiarism detection,
-            AI-generated learning materials, Learning Management Systems, scheduling optimization,
-            healthcare diagnostics, predictive analytics, fraud detection, robo-advisors, Large Language Models, Natural Language Processing,
-            machine learning
-            computer vision, deep learning, chatbots, content generation, autonomous vehicles, smart mobility,
-            generative AI for media, AI in manufacturing, cobots, predictive maintenance, digital twins,
-            personalized recommendations, immersive media, Explainable AI, algorithmic decision-making, robotics,.
-        """
-    coverage_threshold = 0.3
-    main(filepath, ai_trends_text, coverage_threshold)
+    parser = argparse.ArgumentParser(description="Embedding based AI trend coverage report.")
+    parser.add_argument("filepath", nargs="?", default="minors.csv")
+    parser.add_argument("--threshold", type=float, default=COVERAGE_THRESHOLD)
+    parser.add_argument("--trends-file", type=Path, help="comma separated trend list")
+    parser.add_argument("--pooling", choices=("max", "mean"), help="split long texts into passages")
+    parser.add_argument("--workers", type=int, default=1, help="encoding processes")
+    args = parser.parse_args()
+    ai_trends_text = args.trends_file.read_text(encoding="utf-8") if args.trends_file else AI_TRENDS_TEXT
+    main(args.filepath, ai_trends_text, args.threshold, args.pooling, args.workers)
@@ -0,0 +1,107 @@
+"""
+Stand-in chat-completions endpoint for benchmarks and local testing.
+
+Answers every request after ``latency`` seconds with a short canned summary
+(a JSON object of them for packed requests) and can reject a fraction of
+requests with 429 to exercise the retry path.
+
+    python -m benchmarks.llm_server --port 8001 --latency 0.2
+    NOLAI_API_URL=http://127.0.0.1:8001/api/chat/completions python ...
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_handler(latency=0.05, error_rate=0.0):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            time.sleep(latency)
+
+            if random.random() < error_rate:
+                self.send_response(429)
+                self.send_header("Retry-After", "0")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+            user = body["messages"][-1]["content"]
+            # Packed requests put every course under a "### Course <id>" line
+            parts = re.split(r"^### Course (\S+)\n", user, flags=re.M)
+            if len(parts) > 1:
+                content = json.dumps(
+                    {
+                        item_id: f"Summary of {len(text)} characters: {text[:80]}"
+                        for item_id, text in zip(parts[1::2], parts[2::2])
+                    }
+                )
+            else:
+                content = f"Summary of {len(user)} characters: {user[:80]}"
+            payload = json.dumps(
+                {"choices": [{"message": {"role": "assistant", "content": content}}]}
+            ).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    return Handler
+
+
+class BackgroundServer:
+    """Serves ``handler`` on a background thread, on a free port by default."""
+
+    path = "/"
+
+    def __init__(self, handler, host="127.0.0.1", port=0):
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}{self.path}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class StandInLLMServer(BackgroundServer):
+    path = "/api/chat/completions"
+
+    def __init__(self, latency=0.05, error_rate=0.0, host="127.0.0.1", port=0):
+        super().__init__(make_handler(latency, error_rate), host, port)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stand-in chat-completions server.")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    with StandInLLMServer(args.latency, args.error_rate, port=args.port) as server:
+        print(f"Serving {server.url}")
+        server.thread.join()
+
+
+if __name__ == "__main__":
+    main()
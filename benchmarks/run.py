@@ -0,0 +1,334 @@
+"""
+Scaling benchmarks for the pipeline stages on synthetic catalogs.
+
+Every stage runs in a fresh spawned process so its peak RSS is its own.
+Inputs are generated up front and only the stage itself is timed. Network
+stages talk to local stand-ins: the crawl stage revalidates pages against a
+static server with ETags (the browser render needs crawl4ai and a real site
+and is not covered), the summarize stage posts to the stand-in LLM server.
+
+    python -m benchmarks.run --sizes 1000 10000 --save benchmarks/baseline.json
+    python -m benchmarks.run --sizes 1000 10000 --compare benchmarks/baseline.json
+
+``--compare`` exits non-zero when a stage got slower, or used more memory,
+than the baseline by more than ``--tolerance``.
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import multiprocessing
+import platform
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler
+from pathlib import Path
+
+from benchmarks import synthetic
+from benchmarks.llm_server import BackgroundServer, StandInLLMServer
+
+STAGES = ("import", "parse", "crawl", "summarize", "tfidf", "embed", "report")
+
+# Stages bound by network round trips or model inference are capped, so
+# the 100k runs finish in minutes and still measure the per-item cost
+DEFAULT_LIMITS = {"crawl": 10000, "summarize": 1000, "embed": 5000}
+
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self.start
+
+
+def bench_import(workdir, n, options):
+    with Timer() as t:
+        import analysis  # noqa: F401
+    return t.seconds, 1
+
+
+def bench_parse(workdir, n, options):
+    from src.webscraper import HTMLScrapper
+
+    with Timer() as t:
+        courses = HTMLScrapper.scrape_courses(workdir / "courses.html")
+        minors = HTMLScrapper.scrape_minors(workdir / "minors.html")
+    assert len(courses) == len(minors) == n
+    return t.seconds, 2 * n
+
+
+def bench_crawl(workdir, n, options):
+    import requests
+
+    from concurrent.futures import ThreadPoolExecutor
+    from src.crawl_cache import CrawlCache, check_page
+
+    urls = [f"{options['pages_url']}{i}" for i in range(n)]
+    cache = CrawlCache(workdir / "crawl_cache.jsonl")
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=16)
+    session.mount("http://", adapter)
+
+    def check(url):
+        return url, check_page(session, url, cache.get(url))
+
+    with Timer() as t, cache, ThreadPoolExecutor(16) as executor:
+        # Cold pass fills the cache, warm pass only sees 304s
+        for url, (changed, validators) in executor.map(check, urls):
+            cache.store(url, validators, "")
+        for url, (changed, validators) in executor.map(check, urls):
+            assert not changed
+    return t.seconds, 2 * n
+
+
+def bench_summarize(workdir, n, options):
+    import pandas as pd
+
+    from src.llm import summarize_minors
+
+    df = pd.read_csv(workdir / "courses.csv").head(n)
+    with Timer() as t:
+        summarize_minors(
+            df,
+            workdir / "summaries_checkpoint.csv",
+            workdir / "summaries.csv",
+            workers=options["llm_workers"],
+            url=options["llm_url"],
+            backoff=0.01,
+            pack_tokens=options["llm_pack_tokens"],
+        )
+    return t.seconds, n
+
+
+def bench_tfidf(workdir, n, options):
+    from src.analysis import AI_TRENDS_TEXT, load_courses, tfidf_similarity
+
+    with Timer() as t:
+        df = load_courses(workdir / "courses.csv")
+        tfidf_similarity(df, AI_TRENDS_TEXT, 0.08)
+    return t.seconds, n
+
+
+def bench_embed(workdir, n, options):
+    import pandas as pd
+
+    from analysis import AI_TRENDS_TEXT, compute_similarity
+    from src.embeddings import clean_text, get_model
+
+    df = pd.read_csv(workdir / "courses.csv", usecols=["name", "summary"]).head(n)
+    df["clean"] = df["summary"].map(clean_text)
+    trends = [clean_text(t.strip()) for t in AI_TRENDS_TEXT.split(",") if t.strip()]
+    # Model loading is a one-off cost, the "import" stage covers start-up
+    get_model(options["model"])
+    with Timer() as t:
+        compute_similarity(
+            df, trends, cache_dir=workdir / "embeddings", model=options["model"]
+        )
+    return t.seconds, n
+
+
+def bench_report(workdir, n, options):
+    import numpy as np
+    import pandas as pd
+
+    from analysis import AI_TRENDS_TEXT, generate_report
+    from src.scoring import score
+
+    trends = [t.strip() for t in AI_TRENDS_TEXT.split(",") if t.strip()]
+    rng = np.random.default_rng(0)
+    scores = score(rng.normal(size=(n, 32)), rng.normal(size=(len(trends), 32)), 0.3)
+    df = pd.DataFrame({"name": synthetic.course_names(n)})
+    df["ai_trend_similarity"] = scores.max_similarity
+    df["covered_trends"] = scores.covered_trends(trends)
+    matrix = scores.coverage_frame(trends, index=df["name"])
+
+    with Timer() as t:
+        generate_report(df, matrix, trends, 0.3, output_dir=workdir)
+    return t.seconds, n
+
+
+def run_stage(stage, workdir, n, options):
+    bench = globals()[f"bench_{stage}"]
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(
+        io.StringIO()
+    ):
+        seconds, items = bench(Path(workdir), n, options)
+    from src.metrics import peak_rss_bytes
+
+    # Every stage runs in a fresh process, so the process peak is the stage's
+    peak_rss = peak_rss_bytes()
+    return {
+        "items": items,
+        "seconds": round(seconds, 4),
+        "throughput": round(items / seconds, 2) if seconds else None,
+        "peak_rss_mb": round(peak_rss / 2**20, 1) if peak_rss is not None else None,
+    }
+
+
+def page_handler(pages):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            body = pages[int(self.path.rsplit("/", 1)[-1])]
+            etag = '"' + hashlib.md5(body).hexdigest() + '"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+def write_inputs(workdir, n):
+    (workdir / "courses.html").write_text(
+        synthetic.courses_listing_html(n), encoding="utf-8"
+    )
+    (workdir / "minors.html").write_text(
+        synthetic.minors_listing_html(n), encoding="utf-8"
+    )
+    synthetic.courses_frame(n).to_csv(workdir / "courses.csv", index=False)
+
+
+def run(sizes, stages, limits, options):
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            workdir = Path(tmp)
+            write_inputs(workdir, n)
+            rng = random.Random(0)
+            pages = [
+                synthetic.course_markdown(f"Course {i}", "", rng).encode("utf-8")
+                for i in range(min(n, limits.get("crawl") or n))
+            ]
+
+            with BackgroundServer(page_handler(pages)) as page_server:
+                stage_options = {**options, "pages_url": page_server.url}
+                for stage in stages:
+                    size = min(n, limits.get(stage) or n)
+                    with ProcessPoolExecutor(1, mp_context=context) as executor:
+                        future = executor.submit(
+                            run_stage, stage, tmp, size, stage_options
+                        )
+                        try:
+                            result = future.result()
+                        except Exception as e:
+                            result = {"error": f"{type(e).__name__}: {e}"}
+                    results[f"{stage}@{n}"] = result
+                    print(format_result(f"{stage}@{n}", result), flush=True)
+    return results
+
+
+def format_result(key, result):
+    if "error" in result:
+        return f"{key:<16} failed: {result['error']}"
+    return (
+        f"{key:<16} {result['items']:>8} items {result['seconds']:>10.3f} s "
+        f"{result['throughput'] or 0:>12.1f} items/s {result['peak_rss_mb'] or 0:>8.1f} MB"
+    )
+
+
+def compare(results, baseline, tolerance):
+    """Lists the stages that got slower or bigger than the baseline allows."""
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if not base or "error" in base or "error" in result:
+            continue
+        if result["items"] != base["items"]:
+            continue
+        for metric in ("seconds", "peak_rss_mb"):
+            if result[metric] is None or base[metric] is None:
+                continue
+            if result[metric] > base[metric] * (1 + tolerance):
+                regressions.append(
+                    f"{key} {metric}: {base[metric]} -> {result[metric]} "
+                    f"(+{result[metric] / base[metric] - 1:.0%})"
+                )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument(
+        "--limit",
+        action="append",
+        default=[],
+        metavar="STAGE=N",
+        help="cap the items of a stage, 0 for no cap",
+    )
+    parser.add_argument(
+        "--model", help="embedding model id, default the configured one"
+    )
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--llm-workers", type=int, default=8)
+    parser.add_argument(
+        "--llm-pack-tokens", type=int, help="pack descriptions up to this prompt size"
+    )
+    parser.add_argument("--save", type=Path, help="write the results as a baseline")
+    parser.add_argument("--compare", type=Path, help="baseline to check against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    limits = dict(DEFAULT_LIMITS)
+    for limit in args.limit:
+        stage, _, value = limit.partition("=")
+        limits[stage] = int(value)
+
+    with StandInLLMServer(latency=args.llm_latency) as llm:
+        options = {
+            "model": args.model,
+            "llm_url": llm.url,
+            "llm_workers": args.llm_workers,
+            "llm_pack_tokens": args.llm_pack_tokens,
+        }
+        results = run(args.sizes, args.stages, limits, options)
+
+    if args.save:
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Synthetic HAN-style inputs for the benchmarks.
+
+Listing pages mimic the saved course finder (``a.finder-result__title``) and
+minor overview (``h4 > a``) dumps, course markdown mimics a crawled page with
+the shared site chrome around a course specific body.
+"""
+
+import random
+
+WORDS = (
+    "data analyse zorg techniek duurzaamheid onderwijs ontwerp robotica ethiek "
+    "machine learning computer vision privacy logistiek energie marketing "
+    "innovatie onderzoek project samenwerking praktijk studenten vaardigheden "
+    "digital twins smart industry healthcare diagnostics chatbots sensoren"
+).split()
+
+CHROME_HEADER = """[Direct naar de inhoud]({url}#content)
+[ Logo HAN ](https://www.han.nl/ "Ga naar www.han.nl")
+  * [Opleidingen](https://www.han.nl/opleidingen/coursefinder.xml)Submenu
+    * [Voor scholieren](https://www.han.nl/opleidingen/coursefinder.xml#/type-Voltijd)
+    * [Voor werkenden](https://www.han.nl/opleidingen/coursefinder.xml#/type-Deeltijd)
+    * [Bachelor](https://www.han.nl/opleidingen/coursefinder.xml#/level-Hbo)
+    * [Master](https://www.han.nl/opleidingen/coursefinder.xml#/level-Master)
+  * [Studiekeuze](https://www.han.nl/studeren/)Submenu
+  * [Onderzoek](https://www.han.nl/onderzoek/)Submenu
+"""
+
+CHROME_FOOTER = """
+Snel naar
+  * [Agenda](https://www.han.nl/agenda/)
+  * [Werken bij de HAN](https://www.han.nl/over-de-han/werken-bij-de-han/)
+  * [Pers](https://www.han.nl/over-de-han/pers/)
+  * [YouTube](https://www.youtube.com/user/TVHAN/)
+© 2025 HAN University of Applied Sciences
+"""
+
+
+def course_names(n, seed=0):
+    rng = random.Random(seed)
+    return [f"{' '.join(rng.sample(WORDS, 3)).capitalize()} {i}" for i in range(n)]
+
+
+def slug(name):
+    return "-".join(name.lower().split())
+
+
+def courses_listing_html(n, seed=0):
+    items = [f"""      <li class="finder-result js-click-block finder-result--detail">
+        <div class="finder-result-wrapper">
+          <a
+            class="finder-result__title"
+            href="/opleidingen/cursus/{slug(name)}/"
+            >{name}</a
+          >
+          <ul class="finder-result__meta">
+            <li class="finder-result__meta__item featured">
+              <span class="finder-result__meta__item__label">Deeltijd</span>
+            </li>
+          </ul>
+          <p class="finder-result__description">Korte omschrijving van {name}.</p>
+        </div>
+      </li>
+""" for name in course_names(n, seed)]
+    return "<html><body><ul>\n" + "".join(items) + "</ul></body></html>\n"
+
+
+def minors_listing_html(n, seed=0):
+    rows = [f"""                  <tr class="cat-list-row{i % 2}">
+                    <td>
+                      <h4>
+                        <a
+                          href="/en/{i}-{slug(name)}"
+                          >{name}</a
+                        >
+                      </h4>
+                    </td>
+                    <td><span class="period-badge"><b>open</b></span></td>
+                  </tr>
+""" for i, name in enumerate(course_names(n, seed))]
+    return (
+        "<html><body><table><tbody>\n"
+        + "".join(rows)
+        + "</tbody></table></body></html>\n"
+    )
+
+
+def course_markdown(name, url, rng, words=(80, 600)):
+    body = " ".join(rng.choice(WORDS) for _ in range(rng.randint(*words)))
+    return (
+        CHROME_HEADER.format(url=url)
+        + f"#  {name}\n**Duur** 6 maanden\n## Programma\n{body}\n"
+        + CHROME_FOOTER
+    )
+
+
+def courses_frame(n, seed=0):
+    """Crawled courses with ``name``, ``url``, ``markdown`` and ``summary``."""
+    import pandas as pd
+
+    rng = random.Random(seed)
+    names = course_names(n, seed)
+    urls = [f"https://www.han.nl/opleidingen/cursus/{slug(name)}/" for name in names]
+    return pd.DataFrame(
+        {
+            "name": names,
+            "url": urls,
+            "markdown": [course_markdown(n_, u, rng) for n_, u in zip(names, urls)],
+            "summary": [
+                " ".join(rng.choice(WORDS) for _ in range(rng.randint(30, 60)))
+                for _ in names
+            ],
+        }
+    )
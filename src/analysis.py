@@ -1,15 +1,13 @@
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import matplotlib.pyplot as plt
-import numpy as np
-import re
+import argparse
+from pathlib import Path
+
 import pandas as pd
-from fpdf import FPDF
 
-# === Step 1: Load and preprocess ===
+from src.boilerplate import strip_boilerplate
+from src.embeddings import clean_text
 
 # Define AI trends reference (from PDF summary)
-ai_trends_text = """
+AI_TRENDS_TEXT = """
 AI supply chain, sustainability, ethics, bias, digital colonialism, surveillance, privacy, 
 student-focused AI tools (Duolingo, Grammarly, Preply), AI tutors, plagiarism detection, 
 AI-generated learning materials, Learning Management Systems, scheduling optimization, 
@@ -18,57 +16,96 @@ computer vision, deep learning, chatbots, content generation, autonomous vehicle
 generative AI for media, AI in manufacturing (cobots, predictive maintenance), digital twins, 
 personalized recommendations, immersive media, Explainable AI, algorithmic decision-making.
 """
-
-# Load the CSV with course summaries
-df_courses = pd.read_csv("minors_checkpoint.csv")
+COVERAGE_THRESHOLD = 0.08
 
 
-# Clean up the text
-def preprocess(text):
-    text = re.sub(r"\*\*.*?\*\*", "", text)  # remove markdown bold
-    text = re.sub(r"\s+", " ", text)  # normalize whitespace
-    return text.lower()
+# === Step 1: Load and preprocess ===
+def load_courses(filepath):
+    # Load the CSV with course summaries
+    df_courses = pd.read_csv(filepath)
 
+    # Drop the site chrome shared by all pages before scoring
+    markdown, _ = strip_boilerplate(df_courses["markdown"].fillna(""))
+    df_courses["summary_clean"] = pd.Series(markdown, index=df_courses.index).apply(
+        clean_text
+    )
+    return df_courses
 
-df_courses["summary_clean"] = df_courses["markdown"].astype(str).apply(preprocess)
-ai_trends_clean = preprocess(ai_trends_text)
 
 # === Step 2: Compute similarity using TF-IDF ===
-vectorizer = TfidfVectorizer()
-vectors = vectorizer.fit_transform(
-    [ai_trends_clean] + df_courses["summary_clean"].tolist()
-)
-similarity_scores = cosine_similarity(vectors[0:1], vectors[1:]).flatten()
-df_courses["ai_trend_similarity"] = similarity_scores
+def tfidf_similarity(df_courses, ai_trends_text, coverage_threshold):
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    from src.scoring import score
+
+    vectorizer = TfidfVectorizer()
+    vectors = vectorizer.fit_transform(
+        [clean_text(ai_trends_text)] + df_courses["summary_clean"].tolist()
+    )
+    return score(vectors[1:], vectors[0:1], coverage_threshold).max_similarity
+
+
+def tfidf_similarity_incremental(df_courses, ai_trends_text, index_dir, hashing=False):
+    """
+    Like ``tfidf_similarity``, but through a persisted ``TfidfIndex`` that
+    only vectorizes and rescores new or changed courses.
+    """
+    from src.tfidf_index import TfidfIndex
+
+    if "url" in df_courses.columns and df_courses["url"].is_unique:
+        keys = df_courses["url"].astype(str)
+    else:
+        keys = df_courses.index.astype(str)
+    index = TfidfIndex(index_dir, hashing=hashing)
+    changed = index.update(keys, df_courses["summary_clean"])
+    print(f"TF-IDF index: {len(changed)} of {len(df_courses)} courses (re)vectorized")
+    return index.score(clean_text(ai_trends_text)).reindex(keys).values
+
 
 # === Step 3: Print top 15 course matches ===
-top_matches = df_courses.sort_values(by="ai_trend_similarity", ascending=False).head(15)
-print("\nTop Courses Matching AI Trends:\n")
-print(top_matches[["name", "ai_trend_similarity"]])
+def print_top_matches(df_courses, n=15):
+    top_matches = df_courses.sort_values(by="ai_trend_similarity", ascending=False)
+    print("\nTop Courses Matching AI Trends:\n")
+    print(top_matches.head(n)[["name", "ai_trend_similarity"]])
+
 
 # === Step 4: Plot histogram of scores ===
-plt.figure(figsize=(12, 6))
-plt.hist(similarity_scores, bins=30, color="skyblue", edgecolor="black")
-plt.axvline(0.08, color="red", linestyle="--", label="Coverage threshold (0.08)")
-plt.title("Distribution of AI Trend Similarity Scores Across Course Summaries")
-plt.xlabel("Similarity Score")
-plt.ylabel("Number of Courses")
-plt.legend()
-plt.grid(axis="y", linestyle="--", alpha=0.7)
-plt.tight_layout()
-plt.savefig("histogram.jpeg")
-
-# === Step 5: Generate and print summary report ===
-coverage_threshold = 0.08
-covered_courses = df_courses[df_courses["ai_trend_similarity"] >= coverage_threshold]
-not_covered_courses = df_courses[df_courses["ai_trend_similarity"] < coverage_threshold]
-
-coverage_rate = len(covered_courses) / len(df_courses)
-average_similarity = df_courses["ai_trend_similarity"].mean()
-max_similarity = df_courses["ai_trend_similarity"].max()
-min_similarity = df_courses["ai_trend_similarity"].min()
-
-report = f"""
+def plot_histogram(similarity_scores, coverage_threshold, path="histogram.jpeg"):
+    import matplotlib.pyplot as plt
+
+    plt.figure(figsize=(12, 6))
+    plt.hist(similarity_scores, bins=30, color="skyblue", edgecolor="black")
+    plt.axvline(
+        coverage_threshold,
+        color="red",
+        linestyle="--",
+        label=f"Coverage threshold ({coverage_threshold})",
+    )
+    plt.title("Distribution of AI Trend Similarity Scores Across Course Summaries")
+    plt.xlabel("Similarity Score")
+    plt.ylabel("Number of Courses")
+    plt.legend()
+    plt.grid(axis="y", linestyle="--", alpha=0.7)
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
+
+
+# === Step 5: Generate summary report ===
+def build_report(df_courses, coverage_threshold):
+    covered_courses = df_courses[
+        df_courses["ai_trend_similarity"] >= coverage_threshold
+    ]
+    not_covered_courses = df_courses[
+        df_courses["ai_trend_similarity"] < coverage_threshold
+    ]
+
+    coverage_rate = len(covered_courses) / len(df_courses)
+    average_similarity = df_courses["ai_trend_similarity"].mean()
+    max_similarity = df_courses["ai_trend_similarity"].max()
+    min_similarity = df_courses["ai_trend_similarity"].min()
+
+    report = f"""
 🧠 AI Trends Coverage Report (Based on {len(df_courses)} Course Summaries)
 
 1. Overall Coverage
@@ -91,34 +128,88 @@ report = f"""
 - Use high-scoring minors as models for curriculum innovation.
 - A thematic breakdown per trend (e.g. sustainability vs education vs tools) would allow deeper curriculum strategy.
 """
-
-print(report)
-
-
-# Create a simple PDF class
-class PDF(FPDF):
-    def header(self):
-        self.set_font("Arial", "B", 12)
-        self.cell(0, 10, "AI Trends Coverage Report", ln=True, align="C")
-        self.ln(10)
-
-    def chapter_body(self, text):
-        self.set_font("Arial", "", 11)
-        self.multi_cell(0, 10, text)
-        self.ln()
-
-
-# Initialize the PDF
-pdf = PDF()
-pdf.add_page()
-
-clean_report = report.encode("latin-1", "replace").decode("latin-1")
-pdf.chapter_body(clean_report)
-
-# Save to file
-pdf.output("ai_trends_coverage_report.pdf")
-
-print("✅ Report saved to 'ai_trends_coverage_report.pdf'")
-
-# Drop the helper column 'summary_clean' before saving
-df_courses.drop(columns=["summary_clean"]).to_csv("gap_analysis.csv", index=False)
+    return report
+
+
+def save_pdf(report, path="ai_trends_coverage_report.pdf"):
+    from fpdf import FPDF
+
+    # Create a simple PDF class
+    class PDF(FPDF):
+        def header(self):
+            self.set_font("Arial", "B", 12)
+            self.cell(0, 10, "AI Trends Coverage Report", ln=True, align="C")
+            self.ln(10)
+
+        def chapter_body(self, text):
+            self.set_font("Arial", "", 11)
+            self.multi_cell(0, 10, text)
+            self.ln()
+
+    # Initialize the PDF
+    pdf = PDF()
+    pdf.add_page()
+
+    clean_report = report.encode("latin-1", "replace").decode("latin-1")
+    pdf.chapter_body(clean_report)
+
+    # Save to file
+    pdf.output(path)
+
+
+def main(
+    filepath="minors_checkpoint.csv",
+    ai_trends_text=AI_TRENDS_TEXT,
+    coverage_threshold=COVERAGE_THRESHOLD,
+    incremental=False,
+    hashing=False,
+):
+    df_courses = load_courses(filepath)
+    if incremental or hashing:
+        from src.tfidf_index import INDEX_DIR
+
+        index_dir = INDEX_DIR / Path(filepath).stem
+        if hashing:
+            index_dir = index_dir / "hashing"
+        similarity_scores = tfidf_similarity_incremental(
+            df_courses, ai_trends_text, index_dir, hashing
+        )
+    else:
+        similarity_scores = tfidf_similarity(
+            df_courses, ai_trends_text, coverage_threshold
+        )
+    df_courses["ai_trend_similarity"] = similarity_scores
+
+    print_top_matches(df_courses)
+    plot_histogram(similarity_scores, coverage_threshold)
+
+    report = build_report(df_courses, coverage_threshold)
+    print(report)
+    save_pdf(report)
+    print("✅ Report saved to 'ai_trends_coverage_report.pdf'")
+
+    # Drop the helper column 'summary_clean' before saving
+    df_courses.drop(columns=["summary_clean"]).to_csv("gap_analysis.csv", index=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TF-IDF AI trend coverage report.")
+    parser.add_argument("filepath", nargs="?", default="minors_checkpoint.csv")
+    parser.add_argument("--threshold", type=float, default=COVERAGE_THRESHOLD)
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="keep the TF-IDF state on disk and only rescore changed courses",
+    )
+    parser.add_argument(
+        "--hashing",
+        action="store_true",
+        help="incremental, with hashed terms instead of a vocabulary",
+    )
+    args = parser.parse_args()
+    main(
+        args.filepath,
+        coverage_threshold=args.threshold,
+        incremental=args.incremental,
+        hashing=args.hashing,
+    )
@@ -0,0 +1,118 @@
+"""
+Strips site chrome shared by many crawled pages.
+
+The HAN pages all start with the same skip link, logo, navigation menus and
+end with the same footer. Lines that occur on at least ``min_fraction`` of
+the pages are treated as boilerplate and removed before the markdown is sent
+to the LLM or the similarity scorers.
+
+    python -m src.boilerplate data/courses/courses_descriptions.csv out.csv
+"""
+
+import argparse
+import re
+from collections import Counter
+
+import pandas as pd
+
+LINK_TARGET = re.compile(r"\]\([^)]*\)")
+TOKEN = re.compile(r"\w+|[^\w\s]")
+
+
+def line_key(line):
+    # Link targets differ per page (e.g. the "#content" skip link), the
+    # visible text does not
+    return " ".join(LINK_TARGET.sub("]()", line).split())
+
+
+def count_tokens(text):
+    """Rough token count, close enough to compare before and after."""
+    return len(TOKEN.findall(text))
+
+
+class BoilerplateIndex:
+    def __init__(self, min_fraction=0.3, min_pages=5):
+        self.min_fraction = min_fraction
+        self.min_pages = min_pages
+        self.document_frequency = Counter()
+        self.n_documents = 0
+
+    def fit(self, documents):
+        for text in documents:
+            if not isinstance(text, str):
+                continue
+            self.document_frequency.update({line_key(l) for l in text.splitlines()})
+            self.n_documents += 1
+        self.document_frequency.pop("", None)
+        return self
+
+    @property
+    def boilerplate(self):
+        threshold = max(self.min_pages, self.min_fraction * self.n_documents)
+        return {k for k, n in self.document_frequency.items() if n >= threshold}
+
+    def strip(self, text, boilerplate=None):
+        if not isinstance(text, str):
+            return text
+        boilerplate = self.boilerplate if boilerplate is None else boilerplate
+        lines = [l for l in text.splitlines() if line_key(l) not in boilerplate]
+        return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+def strip_boilerplate(texts, min_fraction=0.3, min_pages=5):
+    """
+    Returns the stripped texts and a per-page report of the token reduction.
+    """
+    texts = list(texts)
+    index = BoilerplateIndex(min_fraction, min_pages).fit(texts)
+    boilerplate = index.boilerplate
+    stripped = [index.strip(text, boilerplate) for text in texts]
+
+    tokens_before = [count_tokens(t) if isinstance(t, str) else 0 for t in texts]
+    tokens_after = [count_tokens(t) if isinstance(t, str) else 0 for t in stripped]
+    report = pd.DataFrame(
+        {"tokens_before": tokens_before, "tokens_after": tokens_after}
+    )
+    report["reduction"] = 1 - report["tokens_after"] / report["tokens_before"].where(
+        report["tokens_before"] > 0
+    )
+    return stripped, report
+
+
+def strip_file(in_path, out_path, report_path=None, column="markdown", **kwargs):
+    df = pd.read_csv(in_path)
+    df[column], report = strip_boilerplate(df[column], **kwargs)
+
+    total_before = report["tokens_before"].sum()
+    total_after = report["tokens_after"].sum()
+    print(
+        f"Stripped boilerplate: {total_before} -> {total_after} tokens "
+        f"({1 - total_after / max(total_before, 1):.0%} less)"
+    )
+
+    df.to_csv(out_path, index=False)
+    if report_path is not None:
+        report.insert(0, "url", df["url"])
+        report.to_csv(report_path, index=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Strip cross-page boilerplate.")
+    parser.add_argument("in_path")
+    parser.add_argument("out_path")
+    parser.add_argument("--report", dest="report_path")
+    parser.add_argument("--column", default="markdown")
+    parser.add_argument("--min-fraction", type=float, default=0.3)
+    args = parser.parse_args(argv)
+
+    strip_file(
+        args.in_path,
+        args.out_path,
+        args.report_path,
+        args.column,
+        min_fraction=args.min_fraction,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import json
+import os
+from pathlib import Path
+
+import pandas as pd
+
+
+class CheckpointJournal:
+    """
+    Append-only JSONL journal of finished rows, keyed by URL.
+
+    Every ``append`` writes a single line and fsyncs it, so recording a row
+    costs O(1) no matter how large the catalog is and a crash loses at most
+    the line being written. The latest record for a key wins on reload.
+    """
+
+    def __init__(self, path, key="url"):
+        self.path = Path(path)
+        self.key = key
+        self.records = {}
+        self.superseded = 0
+        self._file = None
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn write from a crash, only ever the last line
+                    continue
+                self.superseded += record[self.key] in self.records
+                self.records[record[self.key]] = record
+
+    def __contains__(self, key):
+        return key in self.records
+
+    def __len__(self):
+        return len(self.records)
+
+    def get(self, key, default=None):
+        return self.records.get(key, default)
+
+    def append(self, record):
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+            # Make sure a torn last line does not swallow the next record
+            if self._file.tell() > 0:
+                with open(self.path, "rb") as f:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        self._file.write("\n")
+
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.superseded += record[self.key] in self.records
+        self.records[record[self.key]] = record
+
+    def compact(self):
+        """Rewrites the journal with only the latest record per key."""
+        self.close()
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for record in self.records.values():
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self.superseded = 0
+
+    def import_csv(self, csv_path, column):
+        """
+        Seeds the journal from a legacy CSV checkpoint, keeping only rows
+        with a non-empty ``column``.
+        """
+        df = pd.read_csv(csv_path)
+        df = df[df[column].notna() & (df[column].astype(str).str.strip() != "")]
+        for record in df[[self.key, column]].to_dict("records"):
+            if record[self.key] not in self.records:
+                self.append(record)
+
+    def lookup(self, keys, column):
+        """Maps ``keys`` to the journalled ``column`` values, NaN when missing."""
+        values = {k: r.get(column) for k, r in self.records.items()}
+        return pd.Series(keys).map(values)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 MINORS_URL = "https://minoren-han.nl"
@@ -5,3 +6,9 @@ DOMAIN_URL = "https://www.han.nl"
 
 DATA_DIR = Path("data/")
 OUTPUT_DIR = Path("output/")
+
+EMBEDDING_CACHE_DIR = DATA_DIR / "embeddings"
+
+# Inference backend for the sentence embeddings: "torch" (fp32), "int8"
+# (dynamically quantized torch) or "onnx"
+EMBEDDING_BACKEND = os.environ.get("EMBEDDING_BACKEND", "torch")
@@ -0,0 +1,55 @@
+import hashlib
+
+from src.checkpoint import CheckpointJournal
+
+
+class CrawlCache(CheckpointJournal):
+    """
+    Journal of crawled pages with their HTTP validators.
+
+    Each record holds the rendered ``markdown`` together with the page's
+    ``etag``, ``last_modified`` and the SHA-256 ``content_hash`` of the raw
+    response body, so a re-crawl can ask the server whether anything changed
+    before paying for a browser render.
+    """
+
+    def store(self, url, validators, markdown):
+        self.append({"url": url, **validators, "markdown": markdown})
+
+    def refresh(self, url, validators):
+        """Updates the validators of an unchanged page if the server rotated them."""
+        record = self.get(url)
+        if any(record.get(k) != v for k, v in validators.items()):
+            self.append({**record, **validators})
+
+
+def check_page(session, url, record=None, timeout=30):
+    """
+    Issues a conditional GET for ``url`` against the cached ``record``.
+
+    Returns ``(changed, validators)``. A 304 answer, or a body whose hash
+    matches the cached one, counts as unchanged.
+    """
+    record = record or {}
+    headers = {}
+    if record.get("etag"):
+        headers["If-None-Match"] = record["etag"]
+    if record.get("last_modified"):
+        headers["If-Modified-Since"] = record["last_modified"]
+
+    response = session.get(url, headers=headers, timeout=timeout)
+    if response.status_code == 304:
+        return False, {
+            k: record.get(k) for k in ("etag", "last_modified", "content_hash")
+        }
+    response.raise_for_status()
+
+    validators = {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "content_hash": hashlib.sha256(response.content).hexdigest(),
+    }
+    changed = "markdown" not in record or (
+        validators["content_hash"] != record.get("content_hash")
+    )
+    return changed, validators
@@ -0,0 +1,255 @@
+"""
+Near-duplicate detection for crawled pages.
+
+Many HAN pages are variants of one another (ISAK level 1/2, day and evening
+editions) with nearly identical markdown. Every page is reduced to a MinHash
+signature of its word shingles; locality sensitive hashing over bands of the
+signature proposes candidate pairs, which are confirmed on their exact
+shingle Jaccard similarity. Groups form around a representative, the first
+page of the group, and only take pages confirmed against that page itself;
+the representative is summarized once for the whole group.
+
+    python -m src.dedup data/courses/courses_descriptions_stripped.csv groups.csv
+"""
+
+import argparse
+import re
+from collections import defaultdict
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+WORD = re.compile(r"\w+")
+
+EMPTY = np.iinfo(np.uint64).max
+
+
+def candidate_probability(similarity, bands, rows):
+    """Chance that a pair with Jaccard ``similarity`` shares at least one band."""
+    return 1 - (1 - similarity**rows) ** bands
+
+
+def lsh_bands(threshold, num_perm, recall=0.99):
+    """
+    Picks ``(bands, rows)`` with ``bands * rows <= num_perm`` such that a
+    pair right at ``threshold`` becomes a candidate with at least ``recall``
+    probability, using as many rows per band as that allows to keep the
+    dissimilar candidates few. Candidates are confirmed on their exact
+    Jaccard similarity, so erring towards recall only costs comparisons.
+    """
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        if candidate_probability(threshold, bands, rows) >= recall:
+            best = (bands, rows)
+    return best
+
+
+def jaccard(a, b):
+    """Jaccard similarity of two arrays of unique shingle hashes."""
+    if not len(a) and not len(b):
+        return 1.0
+    common = len(np.intersect1d(a, b, assume_unique=True))
+    return common / (len(a) + len(b) - common)
+
+
+class MinHashLSH:
+    """
+    Word shingles, MinHash signatures and LSH banding, vectorized over all
+    pages at once.
+
+    Every distinct word gets a random 64-bit value and a shingle hashes the
+    values of its words weighted by position. Signatures use one permutation
+    hashing: a shingle hash picks one of ``num_perm`` bins and only the
+    minimum per bin is kept, so signing costs one pass over the shingles
+    instead of one per permutation. Empty bins borrow the next filled bin
+    (densification) so short pages still get comparable signatures.
+    """
+
+    def __init__(self, threshold=0.9, num_perm=128, shingle_size=5, seed=1):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands, self.rows = lsh_bands(threshold, num_perm)
+        self._rng = np.random.default_rng(seed)
+        self._position = self._random(shingle_size) | np.uint64(1)
+
+    def _random(self, n):
+        return self._rng.integers(0, EMPTY, n, dtype=np.uint64, endpoint=True)
+
+    def shingles(self, texts):
+        """
+        Unique shingle hashes of every text as ``(offsets, hashes)``: those
+        of text ``i`` are ``hashes[offsets[i]:offsets[i + 1]]``. Texts
+        shorter than a shingle are a single shingle.
+        """
+        words = [WORD.findall(t.lower()) if isinstance(t, str) else [] for t in texts]
+        lengths = np.fromiter(map(len, words), dtype=np.intp, count=len(words))
+        all_words = np.fromiter(
+            chain.from_iterable(words), dtype=object, count=lengths.sum()
+        )
+        ids, vocabulary = pd.factorize(all_words)
+        values = self._random(len(vocabulary))[ids]
+        page = np.repeat(np.arange(len(texts)), lengths)
+        ends = np.cumsum(lengths)
+
+        # Shingles start at every word that has ``shingle_size - 1`` words of
+        # the same page after it
+        k = self.shingle_size
+        n = max(len(values) - k + 1, 0)
+        hashes = np.zeros(n, dtype=np.uint64)
+        for j in range(k):
+            hashes += values[j : j + n] * self._position[j]
+        starts = np.flatnonzero(np.arange(n) + k <= ends[page[:n]])
+        pages, hashes = page[starts], hashes[starts]
+
+        short = np.flatnonzero((lengths > 0) & (lengths < k))
+        if len(short):
+            short_hashes = [
+                (values[e - m : e] * self._position[:m]).sum()
+                for e, m in zip(ends[short], lengths[short])
+            ]
+            pages = np.concatenate([pages, short])
+            hashes = np.concatenate([hashes, np.array(short_hashes, np.uint64)])
+
+        order = np.lexsort((hashes, pages))
+        pages, hashes = pages[order], hashes[order]
+        unique = np.ones(len(hashes), dtype=bool)
+        unique[1:] = (pages[1:] != pages[:-1]) | (hashes[1:] != hashes[:-1])
+        pages, hashes = pages[unique], hashes[unique]
+        offsets = np.searchsorted(pages, np.arange(len(texts) + 1))
+        return offsets, hashes
+
+    def signatures(self, offsets, hashes):
+        """MinHash signatures (n, num_perm); all ``EMPTY`` for empty texts."""
+        n, width = len(offsets) - 1, self.num_perm
+        pages = np.repeat(np.arange(n), np.diff(offsets))
+        signatures = np.full((n, width), EMPTY, dtype=np.uint64)
+        np.minimum.at(signatures, (pages, hashes % width), hashes >> np.uint64(32))
+
+        # Densify: an empty bin takes the next filled bin (wrapping around),
+        # offset by the distance so it never equals a filled bin's value
+        doubled = np.concatenate([signatures, signatures], axis=1)
+        index = np.where(doubled != EMPTY, np.arange(2 * width), 2 * width - 1)
+        nearest = np.minimum.accumulate(index[:, ::-1], axis=1)[:, ::-1][:, :width]
+        distance = (nearest - np.arange(width)).astype(np.uint64)
+        dense = np.take_along_axis(doubled, nearest, axis=1)
+        return np.where(dense == EMPTY, EMPTY, dense + (distance << np.uint64(32)))
+
+    def candidate_pairs(self, signatures):
+        """Pairs ``(i, j)``, ``i < j``, that share at least one band."""
+        pairs = set()
+        for band in range(self.bands):
+            buckets = defaultdict(list)
+            chunk = signatures[:, band * self.rows : (band + 1) * self.rows]
+            for i, key in enumerate(map(bytes, chunk)):
+                buckets[key].append(i)
+            for members in buckets.values():
+                for k, i in enumerate(members):
+                    pairs.update((i, j) for j in members[k + 1 :])
+        return pairs
+
+
+def find_near_duplicates(texts, threshold=0.9, **kwargs):
+    """
+    Groups near-identical ``texts``.
+
+    Returns, per text, the index of its group's representative (the first
+    member, itself for unique texts) and its shingle Jaccard similarity to
+    that representative. Missing or empty texts are never grouped.
+    """
+    lsh = MinHashLSH(threshold, **kwargs)
+    offsets, hashes = lsh.shingles(texts)
+    present = np.flatnonzero(np.diff(offsets))
+    signatures = lsh.signatures(offsets, hashes)[present]
+
+    def shingles(i):
+        return hashes[offsets[i] : offsets[i + 1]]
+
+    neighbours = defaultdict(list)
+    for a, b in sorted(lsh.candidate_pairs(signatures)):
+        i, j = present[a], present[b]
+        pair_similarity = jaccard(shingles(i), shingles(j))
+        if pair_similarity >= threshold:
+            neighbours[i].append((j, pair_similarity))
+            neighbours[j].append((i, pair_similarity))
+
+    # Merging every confirmed pair would chain A ~ B ~ C into one group even
+    # when C is far from A. Instead the first page not yet grouped represents
+    # those of its own neighbours that are not grouped either.
+    representatives = np.arange(len(texts), dtype=np.intp)
+    similarity = np.zeros(len(texts))
+    grouped = np.zeros(len(texts), dtype=bool)
+    for i in present:
+        if grouped[i]:
+            continue
+        grouped[i], similarity[i] = True, 1.0
+        for j, pair_similarity in neighbours[i]:
+            if not grouped[j]:
+                grouped[j] = True
+                representatives[j], similarity[j] = i, pair_similarity
+    return representatives, similarity
+
+
+def group_report(df, representatives, similarity):
+    """Audit table of every page in a group of two or more, by group."""
+    report = pd.DataFrame(
+        {
+            "url": df["url"].values,
+            "name": df["name"].values,
+            "representative_url": df["url"].values[representatives],
+            "representative_name": df["name"].values[representatives],
+            "similarity": similarity.round(4),
+            "group_size": np.bincount(representatives, minlength=len(df))[
+                representatives
+            ],
+        }
+    )
+    report = report[report["group_size"] > 1]
+    return report.sort_values(
+        ["group_size", "representative_url", "similarity"],
+        ascending=[False, True, False],
+    )
+
+
+def dedup_file(descriptions_path, groups_path, threshold=0.9, column="markdown"):
+    """
+    Writes the representative of every page of ``descriptions_path`` to
+    ``groups_path`` (url, representative_url, similarity, ...).
+    """
+    df = pd.read_csv(descriptions_path)
+    representatives, similarity = find_near_duplicates(df[column].tolist(), threshold)
+    groups = group_report(df, representatives, similarity)
+
+    pd.DataFrame(
+        {
+            "url": df["url"],
+            "representative_url": df["url"].values[representatives],
+            "similarity": similarity.round(4),
+        }
+    ).to_csv(groups_path, index=False)
+    n_groups = groups["representative_url"].nunique()
+    print(
+        f"{len(groups)} pages in {n_groups} near-duplicate groups, "
+        f"{len(groups) - n_groups} summaries saved"
+    )
+    return groups
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Group near-duplicate pages.")
+    parser.add_argument("descriptions", help="CSV with url, name and markdown")
+    parser.add_argument("groups", help="where to write url -> representative_url")
+    parser.add_argument("--threshold", type=float, default=0.9)
+    parser.add_argument("--column", default="markdown")
+    parser.add_argument("--report", help="optional audit report of the groups")
+    args = parser.parse_args(argv)
+
+    groups = dedup_file(args.descriptions, args.groups, args.threshold, args.column)
+    if args.report:
+        groups.to_csv(args.report, index=False)
+
+
+if __name__ == "__main__":
+    main()
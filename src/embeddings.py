@@ -0,0 +1,221 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from src.config import EMBEDDING_BACKEND
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+BACKENDS = ("torch", "int8", "onnx")
+
+
+def clean_text(text):
+    text = re.sub(r"\*\*.*?\*\*", "", text)  # remove markdown bold
+    text = re.sub(r"\s+", " ", text)  # normalize whitespace
+    return text.lower()
+
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def model_id(model_name=MODEL_NAME, backend=None):
+    """
+    Identifies a model together with its inference backend, e.g.
+    ``all-MiniLM-L6-v2@int8``. Embedding caches are keyed by it, so vectors
+    from different backends never mix.
+    """
+    backend = backend or EMBEDDING_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(
+            f"Unknown embedding backend {backend!r}, use one of {BACKENDS}"
+        )
+    return model_name if backend == "torch" else f"{model_name}@{backend}"
+
+
+# Packages a backend needs beyond those in requirements.txt
+BACKEND_REQUIREMENTS = {"onnx": ("optimum", "onnxruntime")}
+
+
+def check_backend(backend):
+    """Raises ``ImportError`` naming the packages ``backend`` is missing."""
+    from importlib.util import find_spec
+
+    missing = [p for p in BACKEND_REQUIREMENTS.get(backend, ()) if not find_spec(p)]
+    if missing:
+        raise ImportError(
+            f"The {backend} embedding backend needs {' and '.join(missing)}, "
+            f'install them with: pip install "sentence-transformers[{backend}]"'
+        )
+
+
+def load_model(model_name, backend="torch"):
+    from sentence_transformers import SentenceTransformer
+
+    check_backend(backend)
+    if backend == "onnx":
+        return SentenceTransformer(model_name, device="cpu", backend="onnx")
+
+    model = SentenceTransformer(model_name)
+    if backend == "int8":
+        import torch
+
+        # Linear layers carry nearly all of MiniLM's compute
+        model = torch.quantization.quantize_dynamic(
+            model.to("cpu"), {torch.nn.Linear}, dtype=torch.qint8
+        )
+    return model
+
+
+def get_model(model=None):
+    """
+    Loads each model id (see ``model_id``) once per process and keeps it warm.
+    """
+    model = model or model_id()
+    with _models_lock:
+        if model not in _models:
+            model_name, _, backend = model.partition("@")
+            _models[model] = load_model(model_name, backend or "torch")
+        return _models[model]
+
+
+def lazy_encoder(model=None):
+    """
+    Returns an ``encode(texts)`` function that only fetches the model from
+    the registry the first time it is actually called.
+    """
+
+    def encode(texts):
+        return get_model(model).encode(texts, convert_to_numpy=True)
+
+    return encode
+
+
+def text_key(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def cos_sim(a, b):
+    """
+    Cosine similarity between the rows of ``a`` and ``b`` as a dense
+    (len(a), len(b)) float32 matrix.
+    """
+    a = np.asarray(a, dtype=np.float32)
+    b = np.asarray(b, dtype=np.float32)
+    a = a / np.clip(np.linalg.norm(a, axis=1, keepdims=True), 1e-12, None)
+    b = b / np.clip(np.linalg.norm(b, axis=1, keepdims=True), 1e-12, None)
+    return a @ b.T
+
+
+class EmbeddingCache:
+    """
+    On-disk embedding store for a single model.
+
+    Vectors are kept in a memory-mapped float32 ``vectors.npy`` matrix and
+    rows are looked up through ``index.json``, keyed by the SHA-256 of the
+    cleaned text. Only texts that are not in the store yet get encoded.
+    """
+
+    def __init__(self, cache_dir, model_name):
+        self.model_name = model_name
+        self.cache_dir = Path(cache_dir) / model_name.replace("/", "__")
+        self.index_path = self.cache_dir / "index.json"
+        self.vectors_path = self.cache_dir / "vectors.npy"
+        self.keys, self.vectors = self._load()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _load(self):
+        if not (self.index_path.exists() and self.vectors_path.exists()):
+            return [], None
+
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        vectors = np.load(self.vectors_path, mmap_mode="r")
+
+        # A crash between writing the matrix and the index leaves them out of
+        # sync, in which case the store is rebuilt from scratch
+        if index.get("model") != self.model_name or len(index["keys"]) != len(
+            vectors
+        ):
+            return [], None
+        return index["keys"], vectors
+
+    def _write(self, keys, matrix):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        tmp_vectors = self.vectors_path.with_suffix(".tmp.npy")
+        out = np.lib.format.open_memmap(
+            tmp_vectors, mode="w+", dtype=np.float32, shape=matrix.shape
+        )
+        out[:] = matrix
+        out.flush()
+        del out
+
+        tmp_index = self.index_path.with_suffix(".tmp.json")
+        with open(tmp_index, "w", encoding="utf-8") as f:
+            json.dump(
+                {"model": self.model_name, "dim": matrix.shape[1], "keys": keys}, f
+            )
+
+        self.vectors = None
+        os.replace(tmp_vectors, self.vectors_path)
+        os.replace(tmp_index, self.index_path)
+        self.keys = keys
+        self.vectors = np.load(self.vectors_path, mmap_mode="r")
+
+    def clear(self):
+        self.keys, self.vectors = [], None
+        self.index_path.unlink(missing_ok=True)
+        self.vectors_path.unlink(missing_ok=True)
+
+    def encode(self, texts, encode_fn, evict=True, max_entries=None):
+        """
+        Returns the embeddings of ``texts`` as a (len(texts), dim) float32
+        array. ``encode_fn`` is only called with the texts missing from the
+        store. With ``evict`` set, entries for texts that are not part of
+        ``texts`` are dropped, so the store tracks the current corpus.
+        Otherwise the store holds at most ``max_entries``: storing new texts
+        drops the entries least recently stored or looked up at a store.
+        """
+        keys = [text_key(text) for text in texts]
+        rows = {key: i for i, key in enumerate(self.keys)}
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in rows and key not in missing:
+                missing[key] = text
+
+        wanted = set(keys)
+        if evict:
+            kept = [key for key in self.keys if key in wanted]
+        elif missing and max_entries is not None:
+            # The entries of this call move to the recent end before trimming
+            kept = [key for key in self.keys if key not in wanted]
+            kept += [key for key in self.keys if key in wanted]
+            kept = kept[max(0, len(kept) + len(missing) - max_entries) :]
+        else:
+            kept = self.keys
+        if missing or len(kept) != len(self.keys):
+            parts = []
+            if kept:
+                parts.append(np.asarray(self.vectors[[rows[key] for key in kept]]))
+            if missing:
+                parts.append(
+                    np.asarray(encode_fn(list(missing.values())), dtype=np.float32)
+                )
+            if parts:
+                self._write(kept + list(missing), np.concatenate(parts))
+            else:
+                self.clear()
+            rows = {key: i for i, key in enumerate(self.keys)}
+
+        if not keys:
+            dim = self.vectors.shape[1] if self.vectors is not None else 0
+            return np.empty((0, dim), dtype=np.float32)
+        return np.asarray(self.vectors[[rows[key] for key in keys]])
@@ -0,0 +1,130 @@
+"""
+Passage-level encoding engine for long course texts.
+
+MiniLM only looks at the first 256 word pieces, so long course markdown is
+split into overlapping word windows first. Passages are sorted by length and
+batched so each batch holds texts of similar size (little padding), and the
+batches are spread over a pool of worker processes that each keep their own
+copy of the model. Course scores are pooled back from their passages.
+"""
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from src.embeddings import get_model
+from src.metrics import METRICS
+from src.scoring import normalize_rows
+
+
+def split_passages(texts, max_words=180, overlap=30):
+    """
+    Splits every text into windows of at most ``max_words`` words.
+
+    Returns the passages and, per passage, the index of the text it came
+    from. Short texts are kept verbatim so their embeddings are shared with
+    the whole-text path, and every text yields at least one passage.
+    """
+    passages, owners = [], []
+    step = max(1, max_words - overlap)
+    for i, text in enumerate(texts):
+        words = text.split()
+        if len(words) <= max_words:
+            passages.append(text)
+            owners.append(i)
+            continue
+        for start in range(0, len(words) - overlap, step):
+            passages.append(" ".join(words[start : start + max_words]))
+            owners.append(i)
+    return passages, np.asarray(owners, dtype=np.intp)
+
+
+def mean_pool(passage_vectors, owners, n_texts):
+    """Averages the normalized passage vectors of every text."""
+    starts = np.searchsorted(owners, np.arange(n_texts))
+    sums = np.add.reduceat(normalize_rows(passage_vectors), starts, axis=0)
+    return sums / np.bincount(owners, minlength=n_texts)[:, None]
+
+
+def _init_worker(threads):
+    import torch
+
+    torch.set_num_threads(threads)
+
+
+def _encode_batch(args):
+    model, texts = args
+    start = time.perf_counter()
+    vectors = get_model(model).encode(
+        texts, batch_size=len(texts), convert_to_numpy=True
+    )
+    return vectors, time.perf_counter() - start
+
+
+class PassageEncoder:
+    """
+    Length-bucketed encoder, usable as the ``encode_fn`` of an
+    ``EmbeddingCache``. With ``workers > 1`` batches are encoded in a pool of
+    spawned processes, each limited to its share of the CPU threads.
+    """
+
+    def __init__(self, model=None, workers=None, batch_size=32):
+        self.model = model
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _get_pool(self):
+        if self._pool is None:
+            threads = max(1, (os.cpu_count() or 1) // self.workers)
+            self._pool = ProcessPoolExecutor(
+                self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(threads,),
+            )
+        return self._pool
+
+    def __call__(self, texts):
+        return self.encode(texts)
+
+    def encode(self, texts):
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        # Similar lengths end up in the same batch, so padding stays small
+        order = np.argsort([len(text.split()) for text in texts], kind="stable")
+        batches = [
+            (self.model, [texts[i] for i in order[start : start + self.batch_size]])
+            for start in range(0, len(texts), self.batch_size)
+        ]
+
+        if self.workers > 1 and len(batches) > 1:
+            results = list(self._get_pool().map(_encode_batch, batches))
+        else:
+            results = [_encode_batch(batch) for batch in batches]
+
+        # Timed inside the workers: no pool overhead, but a worker's first batch
+        # includes loading the model
+        for (_, texts), (_, seconds) in zip(batches, results):
+            METRICS.observe("encode_batch_seconds", seconds)
+            METRICS.count("encoded_texts_total", len(texts))
+
+        vectors = np.concatenate([v for v, _ in results]).astype(np.float32, copy=False)
+        out = np.empty_like(vectors)
+        out[order] = vectors
+        return out
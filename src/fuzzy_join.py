@@ -0,0 +1,170 @@
+"""
+Fuzzy left join on name columns.
+
+Names are first normalized (case, diacritics, punctuation and whitespace
+folded away) and joined exactly on that key. The remaining names are matched
+through a character n-gram index: the n-grams of the right side form a
+sparse inverted index, and a left name is only compared with right names
+sharing enough of its rarer n-grams. Candidates are scored with the Dice
+coefficient of their n-gram sets, which doubles as the match confidence.
+Names whose numbers differ ("ISAK level 1" and "ISAK level 2") are never
+matched, however similar the rest of them is.
+"""
+
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+
+def normalize_key(name):
+    """Folds case, diacritics, punctuation and whitespace out of a name."""
+    if not isinstance(name, str):
+        return ""
+    text = unicodedata.normalize("NFKD", name)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r"[\W_]+", " ", text.casefold())
+    return " ".join(text.split())
+
+
+def numbers(key):
+    """The numbers in a normalized name, in order, without leading zeros."""
+    return tuple(int(number) for number in re.findall(r"\d+", key))
+
+
+def ngrams(key, n=3):
+    padded = f" {key} "
+    if len(padded) <= n:
+        return {padded}
+    return {padded[i : i + n] for i in range(len(padded) - n + 1)}
+
+
+def ngram_matrix(keys, vocabulary, n=3, grow=False):
+    """
+    Binary CSR matrix of the n-grams of ``keys``; the row sums are the sizes
+    of the n-gram sets. With ``grow`` new n-grams are added to ``vocabulary``,
+    otherwise unknown ones only count towards the set size.
+    """
+    indptr, indices, sizes = [0], [], []
+    for key in keys:
+        grams = ngrams(key, n)
+        for gram in grams:
+            if grow and gram not in vocabulary:
+                vocabulary[gram] = len(vocabulary)
+            if gram in vocabulary:
+                indices.append(vocabulary[gram])
+        indptr.append(len(indices))
+        sizes.append(len(grams))
+    matrix = sparse.csr_matrix(
+        (np.ones(len(indices), dtype=np.float32), indices, indptr),
+        shape=(len(keys), len(vocabulary)),
+    )
+    return matrix, np.asarray(sizes, dtype=np.float32)
+
+
+def _best_per_row(rows, cols, values, k):
+    """The ``k`` highest ``values`` per row, as filtered ``(rows, cols, values)``."""
+    order = np.lexsort((-values, rows))
+    rows, cols, values = rows[order], cols[order], values[order]
+    starts = np.searchsorted(rows, rows, side="left")
+    keep = np.arange(len(rows)) - starts < k
+    return rows[keep], cols[keep], values[keep]
+
+
+def match_keys(left_keys, right_keys, n=3, max_df=0.02, min_grams=6, candidates=10):
+    """
+    Matches every left key to its most similar right key.
+
+    Returns the index of the best right key (-1 when no candidate shares an
+    n-gram and its ``numbers``) and its confidence: 1.0 for identical keys,
+    else the Dice coefficient of the n-gram sets. n-grams found in more
+    than ``max_df`` of the right keys are too common to block on, except for
+    the ``min_grams`` rarest of each left key; per left key only the
+    ``candidates`` right keys sharing the most probed n-grams are scored.
+    """
+    left_keys, right_keys = list(left_keys), list(right_keys)
+    best = np.full(len(left_keys), -1, dtype=np.intp)
+    confidence = np.zeros(len(left_keys), dtype=np.float32)
+
+    exact = {}
+    for j, key in enumerate(right_keys):
+        exact.setdefault(key, j)
+    for i, key in enumerate(left_keys):
+        if key and key in exact:
+            best[i], confidence[i] = exact[key], 1.0
+
+    todo = np.flatnonzero(best < 0)
+    if not len(todo) or not right_keys:
+        return best, confidence
+
+    vocabulary = {}
+    right, right_sizes = ngram_matrix(right_keys, vocabulary, n, grow=True)
+    left, left_sizes = ngram_matrix([left_keys[i] for i in todo], vocabulary, n)
+
+    # Blocking: probe the inverted index with the rare n-grams of every left
+    # key only, but always with at least its ``min_grams`` rarest ones
+    df = np.bincount(right.indices, minlength=right.shape[1])
+    entries = left.tocoo()
+    entry_df = df[entries.col]
+    order = np.lexsort((entry_df, entries.row))
+    rank = np.arange(len(order)) - left.indptr[entries.row[order]]
+    probe = (entry_df[order] <= max(1, max_df * len(right_keys))) | (rank < min_grams)
+    probes = sparse.csr_matrix(
+        (
+            entries.data[order][probe],
+            (entries.row[order][probe], entries.col[order][probe]),
+        ),
+        shape=left.shape,
+    )
+    shared = (probes @ right.T).tocoo()
+
+    # Only keys with the same numbers are candidates at all
+    number_ids = {}
+    left_numbers = np.array(
+        [number_ids.setdefault(numbers(left_keys[i]), len(number_ids)) for i in todo]
+    )
+    right_numbers = np.array(
+        [number_ids.setdefault(numbers(key), len(number_ids)) for key in right_keys]
+    )
+    same = left_numbers[shared.row] == right_numbers[shared.col]
+    rows, cols, _ = _best_per_row(
+        shared.row[same], shared.col[same], shared.data[same], candidates
+    )
+
+    # Score the candidate pairs on all of their n-grams
+    common = np.asarray(left[rows].multiply(right[cols]).sum(axis=1)).ravel()
+    dice = 2 * common / (left_sizes[rows] + right_sizes[cols])
+    rows, cols, dice = _best_per_row(rows, cols, dice, 1)
+    best[todo[rows]] = cols
+    confidence[todo[rows]] = dice
+    return best, confidence
+
+
+def fuzzy_join(left, right, left_on, right_on, min_confidence=0.8, **kwargs):
+    """
+    Left-joins ``right`` onto ``left`` by fuzzy name match, at most one right
+    row per left row, like ``pd.merge(..., how="left", indicator=True)``.
+    Adds ``match_confidence``; matches below ``min_confidence`` are left
+    unjoined and their best guess is kept in ``best_candidate``.
+    """
+    best, confidence = match_keys(
+        left[left_on].map(normalize_key), right[right_on].map(normalize_key), **kwargs
+    )
+    accepted = (best >= 0) & (confidence >= min_confidence)
+
+    left = left.assign(_match=np.where(accepted, best, -1))
+    right = right.reset_index(drop=True).assign(_match=np.arange(len(right)))
+    joined = pd.merge(left, right, on="_match", how="left", indicator=True)
+
+    candidates = right[right_on].reindex(best).values
+    joined.insert(
+        len(joined.columns) - 1, "best_candidate", np.where(accepted, None, candidates)
+    )
+    joined.insert(
+        len(joined.columns) - 1,
+        "match_confidence",
+        np.where(best >= 0, confidence, np.nan),
+    )
+    return joined.drop(columns="_match")
@@ -0,0 +1,224 @@
+"""
+Streaming link extraction for saved listing pages.
+
+The course finder and minor overview dumps are only ever mined for a handful
+of links, so instead of building a DOM the file is read in chunks and
+scanned for tag events. Outside a link of interest the scanner jumps
+straight to the next candidate tag with a single regex search; only the text
+inside a link is tokenized. Names are built like BeautifulSoup's
+``get_text(strip=True)``: every text node stripped, empty ones dropped, the
+rest joined without a separator.
+
+Two kinds of listing are understood:
+
+- ``courses``: ``<a class="finder-result__title" href=...>`` links
+- ``minors``: the first ``<a href=...>`` inside every ``<h4>``
+"""
+
+import html
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+# A comment, tag, declaration or processing instruction starting at "<"
+TOKEN = re.compile(
+    r"""
+    <!--.*?-->
+  | <(/?)([a-zA-Z][^\s/>]*)((?:[^>"']|"[^"]*"|'[^']*')*)>
+  | <![^>]*>
+  | <\?[^>]*>
+    """,
+    re.S | re.X,
+)
+ATTR = re.compile(r"""([^\s=/>"']+)(?:\s*=\s*("[^"]*"|'[^']*'|[^\s>]+))?""")
+RAW_TEXT = ("script", "style")
+
+# Outside a link, only these can change the state
+SKIP_TO = {
+    "courses": re.compile(r"<!--|<(?:script|style)\b|<a[\s/>]", re.I),
+    "minors": re.compile(r"<!--|<(?:script|style)\b|<h4[\s/>]", re.I),
+}
+
+
+def parse_attrs(text):
+    attrs = {}
+    for name, value in ATTR.findall(text):
+        if value[:1] in ("'", '"'):
+            value = value[1:-1]
+        attrs[name.lower()] = html.unescape(value) if value else None
+    return attrs
+
+
+class LinkExtractor:
+    """
+    Incremental extractor: ``feed`` chunks of HTML and collect the
+    ``(name, href)`` records it returns, then ``close`` to flush the rest.
+    """
+
+    def __init__(self, kind):
+        if kind not in SKIP_TO:
+            raise ValueError(
+                f"Unknown listing kind {kind!r}, use one of {list(SKIP_TO)}"
+            )
+        self.kind = kind
+        self._skip_to = SKIP_TO[kind]
+        self._buf = ""
+        self._text = []  # raw pieces of the current text node
+        self._parts = None  # stripped text nodes of the open link
+        self._href = None
+        self._depth = 0  # nested <a> inside the open link
+        self._h4_depth = 0
+        self._h4_link_seen = False
+        self._records = []
+
+    def feed(self, data):
+        self._buf += data
+        self._parse(final=False)
+        return self._take()
+
+    def close(self):
+        self._parse(final=True)
+        self._flush_text()
+        return self._take()
+
+    def _take(self):
+        records, self._records = self._records, []
+        return records
+
+    def _idle(self):
+        return self._parts is None and self._h4_depth == 0
+
+    def _parse(self, final):
+        buf, pos, n = self._buf, 0, len(self._buf)
+        while pos < n:
+            if self._idle():
+                m = self._skip_to.search(buf, pos)
+                if m is None:
+                    # Keep a tail in case a candidate tag is split across chunks
+                    pos = n if final else max(pos, n - 8)
+                    break
+                lt = m.start()
+            else:
+                lt = buf.find("<", pos)
+                if lt < 0:
+                    self._text.append(buf[pos:])
+                    pos = n
+                    break
+                self._text.append(buf[pos:lt])
+
+            if lt + 1 >= n and not final:
+                pos = lt
+                break
+            if lt + 1 >= n or buf[lt + 1] not in "/!?" and not buf[lt + 1].isalpha():
+                # A "<" that cannot start a tag is plain text
+                self._text.append("<")
+                pos = lt + 1
+                continue
+
+            m = TOKEN.match(buf, lt)
+            if m is None:
+                if not final:
+                    pos = lt  # wait for the rest of the tag
+                    break
+                self._text.append("<")
+                pos = lt + 1
+                continue
+
+            closing, tag, attrs = m.groups()
+            pos = m.end()
+            self._flush_text()
+            if tag is None:
+                continue  # comment or declaration, ends the text node
+            tag = tag.lower()
+            if closing:
+                self._end(tag)
+            elif tag in RAW_TEXT:
+                end = re.compile(rf"</{tag}\s*>", re.I).search(buf, pos)
+                if end is None:
+                    if not final:
+                        pos = lt
+                        break
+                    pos = n
+                else:
+                    pos = end.end()
+            else:
+                self._start(tag, attrs)
+                if attrs.rstrip().endswith("/"):
+                    self._end(tag)
+        self._buf = buf[pos:]
+
+    def _flush_text(self):
+        if self._text:
+            if self._parts is not None:
+                text = html.unescape("".join(self._text)).strip()
+                if text:
+                    self._parts.append(text)
+            self._text = []
+
+    def _open_link(self, href):
+        self._parts = []
+        self._href = href or ""
+        self._depth = 1
+
+    def _close_link(self):
+        self._records.append(("".join(self._parts), self._href))
+        self._parts = None
+        self._depth = 0
+
+    def _start(self, tag, attrs):
+        if tag == "h4" and self.kind == "minors":
+            self._h4_depth += 1
+            self._h4_link_seen = False
+        if tag != "a":
+            return
+        if self._parts is not None:
+            self._depth += 1
+            return
+
+        attrs = parse_attrs(attrs)
+        if self.kind == "courses":
+            if "finder-result__title" in (attrs.get("class") or "").split():
+                self._open_link(attrs.get("href"))
+        elif self._h4_depth and not self._h4_link_seen:
+            self._h4_link_seen = True
+            if "href" in attrs:
+                self._open_link(attrs["href"])
+
+    def _end(self, tag):
+        if tag == "a" and self._parts is not None:
+            self._depth -= 1
+            if self._depth == 0:
+                self._close_link()
+        elif tag == "h4" and self._h4_depth:
+            # Closing the heading also closes a link left open inside it
+            if self._parts is not None and self.kind == "minors":
+                self._close_link()
+            self._h4_depth -= 1
+
+
+def iter_links(path, kind, chunk_size=1 << 20):
+    """Yields ``(name, href)`` from the listing at ``path`` while reading it."""
+    extractor = LinkExtractor(kind)
+    with open(path, "r", encoding="utf-8") as f:
+        while chunk := f.read(chunk_size):
+            yield from extractor.feed(chunk)
+    yield from extractor.close()
+
+
+def _extract_file(args):
+    return list(iter_links(*args))
+
+
+def extract_links(paths, kind, workers=None):
+    """
+    Extracts the links of several listing pages (e.g. a paginated dump),
+    parsing up to ``workers`` files in parallel. Records keep the order of
+    ``paths``.
+    """
+    paths = list(paths)
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    if workers <= 1:
+        return [record for path in paths for record in iter_links(path, kind)]
+    with ProcessPoolExecutor(workers) as executor:
+        pages = executor.map(_extract_file, [(path, kind) for path in paths])
+        return [record for page in pages for record in page]
@@ -1,84 +1,387 @@
+import hashlib
+import json
 import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+
+import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
 from tqdm import tqdm
 
+from src.checkpoint import CheckpointJournal
+from src.metrics import METRICS
+
+API_URL = os.environ.get("NOLAI_API_URL", "https://chat.nolai.fyi/api/chat/completions")
+MODEL = "gemma3:4b"
+
+SYSTEM_PROMPT = (
+    "You are a helpful assistant that summarizes academic course descriptions. "
+    "Your task is to read and analyze a course description provided in markdown format. "
+    "From this content, extract and summarize the core learning objectives and the key skills students will develop. "
+    "Also highlight the relevant technologies or domains the course focuses on. "
+    "Return a short, clear summary (2-3 sentences) suitable for students evaluating the course."
+)
+
+# Several descriptions per request: each under a "### Course <id>" header,
+# answered as one JSON object so the summaries can be split again
+PACKED_SYSTEM_PROMPT = (
+    "You are a helpful assistant that summarizes academic course descriptions. "
+    "You will receive several course descriptions in markdown format, each starting with a line '### Course <id>'. "
+    "For every course, extract and summarize the core learning objectives and the key skills students will develop. "
+    "Also highlight the relevant technologies or domains the course focuses on. "
+    "Write a short, clear summary (2-3 sentences) suitable for students evaluating the course. "
+    'Return only a JSON object mapping every course id to its summary, e.g. {"1": "...", "2": "..."}.'
+)
+COURSE_HEADER = "### Course {}"
+
+# Rough prompt size estimate, no tokenizer needed
+CHARS_PER_TOKEN = 4
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class RetryableError(Exception):
+    pass
+
+
+class RateLimiter:
+    """
+    Adaptive spacing between request starts, shared by all worker threads.
+
+    Additive increase, additive decrease: every 429 without a Retry-After
+    widens the interval by ``step`` and every success narrows it by
+    ``step * recovery``. The interval only keeps growing while more than
+    ``recovery / (1 + recovery)`` of the answers (3 in 7 by default) are
+    429s, so sporadic rejections cannot ratchet it up to ``max_interval``.
+    A Retry-After only holds back the next request start and leaves the
+    interval alone.
+    """
+
+    def __init__(self, min_interval=0.0, max_interval=30.0, step=0.1, recovery=0.75):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.step = step
+        self.recovery = recovery
+        self.interval = min_interval
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def throttle(self, retry_after=None):
+        with self._lock:
+            if retry_after is not None:
+                self._next_slot = max(self._next_slot, time.monotonic() + retry_after)
+            else:
+                self.interval = min(self.max_interval, self.interval + self.step)
+
+    def success(self):
+        with self._lock:
+            self.interval = max(
+                self.min_interval, self.interval - self.step * self.recovery
+            )
+
+
+def make_session(pool_size=10):
+    """Keep-alive HTTP session whose connection pool fits ``pool_size`` workers."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(
+        {
+            "Authorization": f"Bearer {os.environ.get('NOLAI_API_KEY')}",
+            "Content-Type": "application/json",
+        }
+    )
+    return session
+
+
+def _retry_after(response):
+    try:
+        return float(response.headers.get("Retry-After", ""))
+    except ValueError:
+        return None
+
 
 def clean_summary_output(response_text):
     # Remove <think>...</think> blocks if present
-    import re
-
     return re.sub(r"<think>.*?</think>", "", response_text, flags=re.DOTALL).strip()
 
 
-def chat_with_model(markdown_content):
-    api_key = os.environ.get("NOLAI_API_KEY")
-    url = "https://chat.nolai.fyi/api/chat/completions"
-    model = "gemma3:4b"
-
-    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
-    data = {
-        "model": model,
-        "messages": [
-            {
-                "role": "system",
-                "content": (
-                    "You are a helpful assistant that summarizes academic course descriptions. "
-                    "Your task is to read and analyze a course description provided in markdown format. "
-                    "From this content, extract and summarize the core learning objectives and the key skills students will develop. "
-                    "Also highlight the relevant technologies or domains the course focuses on. "
-                    "Return a short, clear summary (2-3 sentences) suitable for students evaluating the course."
-                ),
-            },
-            {"role": "user", "content": markdown_content},
-        ],
+def _post_chat(
+    messages,
+    session=None,
+    url=API_URL,
+    timeout=60,
+    max_retries=5,
+    backoff=1.0,
+    rate_limiter=None,
+):
+    """Posts a chat completion request and returns the answer text."""
+    session = session or make_session(pool_size=1)
+    data = {"model": MODEL, "messages": messages}
+
+    body = json.dumps(data).encode("utf-8")
+    headers = {"Content-Type": "application/json"}
+    METRICS.observe("llm_request_bytes", len(body))
+
+    for attempt in range(max_retries + 1):
+        if rate_limiter is not None:
+            rate_limiter.wait()
+        start = time.perf_counter()
+        try:
+            response = session.post(url, data=body, headers=headers, timeout=timeout)
+            METRICS.observe(
+                "llm_request_seconds",
+                time.perf_counter() - start,
+                status=response.status_code,
+            )
+            if response.status_code in RETRY_STATUS:
+                if response.status_code == 429 and rate_limiter is not None:
+                    rate_limiter.throttle(_retry_after(response))
+                raise RetryableError(f"HTTP {response.status_code}")
+            response.raise_for_status()
+        except (RetryableError, requests.ConnectionError, requests.Timeout) as e:
+            if attempt == max_retries:
+                raise
+            reason = str(e) if isinstance(e, RetryableError) else type(e).__name__
+            METRICS.count("llm_retries_total", reason=reason)
+            # Exponential backoff with jitter
+            delay = backoff * 2**attempt
+            time.sleep(delay + random.uniform(0, delay / 2))
+            continue
+
+        if rate_limiter is not None:
+            rate_limiter.success()
+        METRICS.observe("llm_response_bytes", len(response.content))
+        return response.json()["choices"][0]["message"]["content"]
+
+
+def chat_with_model(markdown_content, **kwargs):
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": markdown_content},
+    ]
+    return clean_summary_output(_post_chat(messages, **kwargs))
+
+
+def content_hash(markdown):
+    return hashlib.sha256(markdown.encode("utf-8")).hexdigest()
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def pack_items(items, token_budget, max_items=10):
+    """
+    Groups ``(id, markdown)`` items, in order, into packs whose prompt
+    (system prompt included) stays within ``token_budget`` tokens. An item
+    too large for the budget on its own gets a pack of its own.
+    """
+    overhead = estimate_tokens(PACKED_SYSTEM_PROMPT)
+    packs, pack, used = [], [], overhead
+    for item_id, markdown in items:
+        tokens = estimate_tokens(COURSE_HEADER.format(item_id)) + estimate_tokens(
+            markdown
+        )
+        if pack and (used + tokens > token_budget or len(pack) >= max_items):
+            packs.append(pack)
+            pack, used = [], overhead
+        pack.append((item_id, markdown))
+        used += tokens
+    if pack:
+        packs.append(pack)
+    return packs
+
+
+def parse_packed_response(text, ids):
+    """
+    The summaries of a packed answer by id. Ids the answer leaves out or
+    answers with anything but a non-empty string are missing from the result;
+    an answer that is not a JSON object yields an empty dict.
+    """
+    text = clean_summary_output(text)
+    # Models like to wrap JSON in a ```json fence or a sentence
+    start, end = text.find("{"), text.rfind("}")
+    try:
+        answer = json.loads(text[start : end + 1]) if start >= 0 else None
+    except json.JSONDecodeError:
+        answer = None
+    if not isinstance(answer, dict):
+        return {}
+    answer = {str(key).strip(): value for key, value in answer.items()}
+    return {
+        item_id: answer[str(item_id)].strip()
+        for item_id in ids
+        if isinstance(answer.get(str(item_id)), str) and answer[str(item_id)].strip()
     }
 
-    response = requests.post(url, headers=headers, json=data)
-    text_response = response.json()["choices"][0]["message"]["content"]
-    clean_text_response = clean_summary_output(text_response)
-    return clean_text_response
 
+def summarize_pack(pack, **kwargs):
+    """
+    Summarizes a pack of ``(id, markdown)`` items with one request and
+    returns ``{id: summary or exception}``. Items the answer does not cover,
+    or all of them if the request fails, are summarized one by one.
+    """
+    summaries = {}
+    if len(pack) > 1:
+        content = "\n\n".join(
+            f"{COURSE_HEADER.format(item_id)}\n{markdown}" for item_id, markdown in pack
+        )
+        messages = [
+            {"role": "system", "content": PACKED_SYSTEM_PROMPT},
+            {"role": "user", "content": content},
+        ]
+        try:
+            answer = _post_chat(messages, **kwargs)
+        except Exception:
+            answer = ""
+        summaries = parse_packed_response(answer, [item_id for item_id, _ in pack])
+        if len(summaries) == len(pack):
+            outcome = "ok"
+        else:
+            outcome = "partial" if summaries else "malformed"
+        METRICS.count("llm_packed_requests_total", outcome=outcome)
+
+    for item_id, markdown in pack:
+        if item_id not in summaries:
+            try:
+                summaries[item_id] = chat_with_model(markdown, **kwargs)
+            except Exception as e:
+                summaries[item_id] = e
+    return summaries
+
+
+def summarize_minors(
+    df,
+    checkpoint_path: Path,
+    result_path: Path,
+    workers=1,
+    changed_urls=(),
+    representatives=None,
+    pack_tokens=None,
+    max_pack_items=10,
+    **kwargs,
+):
+    """
+    Summarizes the ``markdown`` of every row, skipping URLs that already have
+    a summary in the checkpoint journal. With ``workers > 1`` requests are
+    sent from a thread pool sharing one keep-alive session and rate limiter;
+    remaining keyword arguments are passed on to ``chat_with_model``.
+
+    Progress is journalled next to ``checkpoint_path`` as ``.jsonl``; a legacy
+    CSV checkpoint at ``checkpoint_path`` is imported into it once. The full
+    result table is only written to ``result_path`` at the end. Every record
+    keeps the hash of the markdown it summarizes, and a row is only
+    summarized again when its markdown no longer matches. Records without a
+    hash (imported ones) are redone when their URL is in ``changed_urls``
+    (see ``crawl_cached``).
+
+    ``representatives`` maps a URL to the representative URL of its group of
+    near-duplicate pages (see ``src.dedup``); only representatives are sent
+    to the model and every member gets its representative's summary.
+
+    With ``pack_tokens`` several descriptions share one request of at most
+    that many prompt tokens (and ``max_pack_items`` descriptions), answered
+    as JSON keyed by row; rows missing from a malformed answer are retried
+    one request each.
+    """
+    checkpoint_path = Path(checkpoint_path)
+    journal_path = checkpoint_path.with_suffix(".jsonl")
+    import_legacy = not journal_path.exists() and checkpoint_path.suffix == ".csv"
 
-def summarize_minors(df, checkpoint_path: Path, result_path: Path):
     # Load existing progress if available
-    if os.path.exists(checkpoint_path):
-        df_checkpoint = pd.read_csv(checkpoint_path)
-        df_valid = df_checkpoint[
-            df_checkpoint["summary"].notna()
-            & (df_checkpoint["summary"].str.strip() != "")
-        ]
-        processed_urls = set(df_valid["url"].dropna())
-    else:
-        df_checkpoint = df.copy()
-        df_checkpoint["markdown"] = ""
-        df_checkpoint["summary"] = ""
-        processed_urls = set()
+    journal = CheckpointJournal(journal_path)
+    if import_legacy and checkpoint_path.exists():
+        journal.import_csv(checkpoint_path, "summary")
 
-    for i, row in tqdm(df.iterrows(), total=len(df), desc="Summarizing"):
-        url = row["url"]
-        if url in processed_urls:
-            print(f"done: {i}")
+    group = df["url"]
+    if representatives is not None:
+        group = group.map(representatives).fillna(group)
+        group = group.where(group.isin(df["url"]), df["url"])
+    is_representative = (group == df["url"]).values
+    n_groups = int(is_representative.sum())
 
-            continue  # already done
+    changed_urls = set(changed_urls)
 
-        try:
-            # Crawl
-            markdown = row["markdown"]
-            # Summarize
-            summary = chat_with_model(markdown)
+    def needs_summary(row):
+        record = journal.get(row["url"])
+        if record is None:
+            return True
+        if "content_hash" not in record:
+            return row["url"] in changed_urls
+        return record["content_hash"] != content_hash(row["markdown"])
 
-            # Store results
-            df_checkpoint.loc[i, "markdown"] = markdown
-            df_checkpoint.loc[i, "summary"] = summary
+    todo = [
+        (i, row) for i, row in df[is_representative].iterrows() if needs_summary(row)
+    ]
+    print(f"Resuming: {n_groups - len(todo)} of {n_groups} rows already summarized")
+    if n_groups < len(df):
+        print(f"Sharing summaries with {len(df) - n_groups} near-duplicate rows")
 
-            # Save after each successful item
-            df_checkpoint.to_csv(checkpoint_path, index=False)
-            print(f"Saved row {i}: {row['name']}")
+    METRICS.count("summaries_total", n_groups - len(todo), outcome="cached")
+    METRICS.count("summaries_total", len(df) - n_groups, outcome="duplicate")
 
-        except Exception as e:
-            print(f"Error at row {i} ({url}): {e}")
-            continue
+    rate_limiter = RateLimiter()
+
+    # The pool shuts down before the session closes, also on errors
+    with METRICS.span("summarize_minors"), journal, make_session(
+        pool_size=workers
+    ) as session, ThreadPoolExecutor(max_workers=workers) as executor:
+        rows = dict(todo)
+        items = [(i, row["markdown"]) for i, row in todo]
+        if pack_tokens:
+            packs = pack_items(items, pack_tokens, max_pack_items)
+        else:
+            packs = [[item] for item in items]
+        futures = [
+            executor.submit(
+                summarize_pack,
+                pack,
+                session=session,
+                rate_limiter=rate_limiter,
+                **kwargs,
+            )
+            for pack in packs
+        ]
+
+        # Results are journalled from this thread only, so appends never race
+        with tqdm(total=len(todo), desc="Summarizing") as progress:
+            for future in as_completed(futures):
+                for i, summary in future.result().items():
+                    row = rows[i]
+                    progress.update()
+                    if isinstance(summary, Exception):
+                        print(f"Error at row {i} ({row['url']}): {summary}")
+                        METRICS.count("summaries_total", outcome="error")
+                        continue
+
+                    METRICS.count("summaries_total", outcome="ok")
+
+                    journal.append(
+                        {
+                            "url": row["url"],
+                            "name": row["name"],
+                            "summary": summary,
+                            "content_hash": content_hash(row["markdown"]),
+                        }
+                    )
+                    print(f"Saved row {i}: {row['name']}")
 
     # Final save
-    df_checkpoint.to_csv(result_path, index=False)
+    df_result = df.copy()
+    df_result["summary"] = journal.lookup(group, "summary").fillna("").values
+    df_result.to_csv(result_path, index=False)
@@ -7,12 +7,18 @@ import asyncio
 from tqdm import tqdm
 
 from src.config import DATA_DIR
+from src.fuzzy_join import fuzzy_join
 
 from src.webscraper import HTMLScrapper
 import chardet
 
 
-def main():
+def main(
+    descriptions_path=DATA_DIR / "courses" / "course_descriptions.csv",
+    table_path=DATA_DIR / "courses" / "courses_full_table_laurie.csv",
+    merged_path=DATA_DIR / "courses" / "merged.csv",
+    min_confidence=0.8,
+):
 
     # Your enrichment data
     data = [
@@ -42,9 +48,9 @@ def main():
     ]
 
     # Load your CSV data
-    df1 = pd.read_csv(DATA_DIR / "courses" / "course_descriptions.csv")
+    df1 = pd.read_csv(descriptions_path)
     df2 = pd.read_csv(
-        DATA_DIR / "courses" / "courses_full_table_laurie.csv",
+        table_path,
         sep=";",
         encoding="ISO-8859-1",
         quotechar='"',
@@ -78,26 +84,27 @@ def main():
     # ✅ Append the rows to df2
     df2 = pd.concat([df2, enrichment_df], ignore_index=True)
 
-    # Merge with df1 using 'name' and 'Naam opleiding'
-    merged = pd.merge(
-        df1, df2, left_on="name", right_on="Naam opleiding", how="left", indicator=True
-    )
+    # Fuzzy merge with df1 using 'name' and 'Naam opleiding', names that only
+    # differ in case, whitespace, diacritics or punctuation match exactly
+    merged = fuzzy_join(df1, df2, "name", "Naam opleiding", min_confidence)
 
     # Print merge statistics
     match_counts = merged["_merge"].value_counts()
+    fuzzy = (merged["_merge"] == "both") & (merged["match_confidence"] < 1)
     print("\nMerge results:")
     print(match_counts)
     print(f"\n✅ Rows merged correctly: {match_counts.get('both', 0)}")
+    print(f"🔍 Of which fuzzy matches: {fuzzy.sum()}")
     print(f"❌ Rows with no match in df2: {match_counts.get('left_only', 0)}")
 
     # Save merged file
-    merged.to_csv(DATA_DIR / "courses" / "merged.csv", index=False)
+    merged.to_csv(merged_path, index=False)
 
     # Save unmatched course names (optional)
     unmatched = merged[merged["_merge"] == "left_only"]
     if not unmatched.empty:
-        unmatched_names = unmatched[["name"]]
-        unmatched_names.to_csv(DATA_DIR / "courses" / "unmatched.csv", index=False)
+        unmatched_names = unmatched[["name", "best_candidate", "match_confidence"]]
+        unmatched_names.to_csv(Path(merged_path).parent / "unmatched.csv", index=False)
         print(f"\n⚠️ Unmatched rows saved to 'unmatched.csv'")
 
 
@@ -0,0 +1,224 @@
+"""
+Lightweight tracing for the pipeline's hot paths.
+
+Code records counters, histograms and timed spans on the process-wide
+``METRICS`` registry; nothing is sent anywhere while the run is going.
+``export`` writes everything at the end as a JSON run report and as a
+Prometheus text file (for the node exporter's textfile collector).
+
+    with METRICS.span("compute_similarity"):
+        ...
+    METRICS.observe("llm_request_seconds", elapsed, status="200")
+    METRICS.count("llm_retries_total", reason="HTTP 429")
+"""
+
+import bisect
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from src.config import OUTPUT_DIR
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+METRICS_DIR = OUTPUT_DIR / "metrics"
+
+# Upper bounds, the last bucket (+Inf) is implicit
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+BYTES_BUCKETS = tuple(2**i for i in range(8, 25, 2))
+
+
+def peak_rss_bytes():
+    """
+    High-water mark of the process's resident memory over its whole
+    lifetime, not of any one span; ``None`` where it is not available.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, KiB on Linux and the BSDs
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.max = None
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.max = value if self.max is None else max(self.max, value)
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else None,
+            "max": self.max,
+            "buckets": dict(
+                zip([str(b) for b in self.buckets] + ["+Inf"], self.counts)
+            ),
+        }
+
+
+def _labels_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape_label(value):
+    # The text format only escapes these three inside label values
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape_label(v)}"' for k, v in pairs) + "}"
+
+
+class Metrics:
+    """Thread-safe registry of counters, gauges, histograms and spans."""
+
+    def __init__(self, max_spans=10000):
+        self.max_spans = max_spans
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self.counters = {}
+            self.gauges = {}
+            self.histograms = {}
+            self.spans = []
+            self.dropped_spans = 0
+
+    def count(self, name, value=1, **labels):
+        key = (name, _labels_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def gauge(self, name, value, **labels):
+        with self._lock:
+            self.gauges[(name, _labels_key(labels))] = value
+
+    def observe(self, name, value, buckets=None, **labels):
+        """Adds ``value`` to a histogram; ``*_bytes`` names get size buckets."""
+        if buckets is None:
+            buckets = BYTES_BUCKETS if name.endswith("_bytes") else SECONDS_BUCKETS
+        key = (name, _labels_key(labels))
+        with self._lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram(buckets)
+            self.histograms[key].observe(value)
+
+    @contextmanager
+    def span(self, name, **labels):
+        """
+        Times the block into the ``<name>_seconds`` histogram and keeps a
+        record of it. The record carries the process's peak RSS so far when
+        the block ended, which only rises above that of earlier spans if the
+        block itself set a new high-water mark.
+        """
+        start = time.time()
+        t0 = time.perf_counter()
+        status = "ok"
+        try:
+            yield
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            elapsed = time.perf_counter() - t0
+            rss = peak_rss_bytes()
+            self.observe(f"{name}_seconds", elapsed, **labels)
+            if rss is not None:
+                self.gauge("process_peak_rss_bytes", rss)
+            record = {
+                "name": name,
+                "labels": {k: str(v) for k, v in labels.items()},
+                "start": round(start - self.started, 6),
+                "seconds": round(elapsed, 6),
+                "process_peak_rss_bytes": rss,
+                "status": status,
+                "thread": threading.current_thread().name,
+            }
+            with self._lock:
+                if len(self.spans) < self.max_spans:
+                    self.spans.append(record)
+                else:
+                    self.dropped_spans += 1
+
+    def report(self):
+        def entries(items, to_value):
+            return [
+                {"name": name, "labels": dict(key), "value": to_value(value)}
+                for (name, key), value in sorted(items.items())
+            ]
+
+        with self._lock:
+            return {
+                "started": self.started,
+                "seconds": round(time.time() - self.started, 6),
+                "process_peak_rss_bytes": peak_rss_bytes(),
+                "counters": entries(self.counters, lambda v: v),
+                "gauges": entries(self.gauges, lambda v: v),
+                "histograms": entries(self.histograms, Histogram.to_dict),
+                "spans": list(self.spans),
+                "dropped_spans": self.dropped_spans,
+            }
+
+    def prometheus_text(self, prefix="gap_analysis_"):
+        lines = []
+        with self._lock:
+            for kind, items in (("counter", self.counters), ("gauge", self.gauges)):
+                for name in sorted({name for name, _ in items}):
+                    lines.append(f"# TYPE {prefix}{name} {kind}")
+                    for (n, key), value in sorted(items.items()):
+                        if n == name:
+                            lines.append(f"{prefix}{name}{_format_labels(key)} {value}")
+
+            for name in sorted({name for name, _ in self.histograms}):
+                lines.append(f"# TYPE {prefix}{name} histogram")
+                for (n, key), hist in sorted(self.histograms.items()):
+                    if n != name:
+                        continue
+                    cumulative = 0
+                    bounds = [str(b) for b in hist.buckets] + ["+Inf"]
+                    for bound, count in zip(bounds, hist.counts):
+                        cumulative += count
+                        labels = _format_labels(key, [("le", bound)])
+                        lines.append(f"{prefix}{name}_bucket{labels} {cumulative}")
+                    labels = _format_labels(key)
+                    lines.append(f"{prefix}{name}_sum{labels} {hist.sum}")
+                    lines.append(f"{prefix}{name}_count{labels} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, name="run", output_dir=METRICS_DIR):
+        """Writes ``<name>_report.json`` and ``<name>.prom`` to ``output_dir``."""
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        with open(output_dir / f"{name}_report.json", "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2)
+
+        # Write then rename, so a scraper never reads a half-written file
+        prom_path = output_dir / f"{name}.prom"
+        tmp_path = prom_path.with_suffix(".prom.tmp")
+        tmp_path.write_text(self.prometheus_text(), encoding="utf-8")
+        tmp_path.replace(prom_path)
+        return output_dir / f"{name}_report.json", prom_path
+
+
+METRICS = Metrics()
@@ -0,0 +1,431 @@
+"""
+Runs the gap analysis workflow as a DAG of stages.
+
+Every stage declares the files it reads and writes plus the parameters that
+influence it. Its fingerprint hashes all of those together, and a stage is
+only run again when the fingerprint differs from the last successful run or
+one of its outputs is missing. Stages whose inputs are ready run
+concurrently. Row-level reuse happens inside the stages through the crawl
+cache, the summary journal and the embedding cache.
+
+    python -m src.pipeline --dry-run
+    python -m src.pipeline --trends-file trends.txt --threshold 0.35
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+import pandas as pd
+
+from src.config import DATA_DIR, OUTPUT_DIR
+from src.metrics import METRICS
+
+STATE_PATH = DATA_DIR / "pipeline_state.json"
+
+MINORS_DIR = DATA_DIR / "minors"
+COURSES_DIR = DATA_DIR / "courses"
+SCORES_DIR = DATA_DIR / "scores"
+
+
+class Stage:
+    """
+    ``params`` are part of the fingerprint, ``options`` (pool sizes and the
+    like, which do not change the outputs) are only passed on to ``func``.
+    """
+
+    def __init__(self, name, func, inputs=(), outputs=(), params=None, options=None):
+        self.name = name
+        self.func = func
+        self.inputs = [Path(p) for p in inputs]
+        self.outputs = [Path(p) for p in outputs]
+        self.params = params or {}
+        self.options = options or {}
+
+    def fingerprint(self):
+        h = hashlib.sha256()
+        h.update(self.name.encode())
+        h.update(json.dumps(self.params, sort_keys=True, default=str).encode())
+        for path in self.inputs:
+            h.update(str(path).encode())
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    h.update(chunk)
+        return h.hexdigest()
+
+    def run(self):
+        for path in self.outputs:
+            path.parent.mkdir(parents=True, exist_ok=True)
+        with METRICS.span("stage", stage=self.name):
+            self.func(*self.inputs, *self.outputs, **self.params, **self.options)
+
+
+class Pipeline:
+    def __init__(self, stages, state_path=STATE_PATH):
+        self.stages = {stage.name: stage for stage in stages}
+        self.state_path = Path(state_path)
+
+        # A stage depends on every stage producing one of its inputs
+        producers = {p: s.name for s in stages for p in s.outputs}
+        self.deps = {
+            s.name: {producers[p] for p in s.inputs if p in producers} for s in stages
+        }
+
+    def _load_state(self):
+        if self.state_path.exists():
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return {}
+
+    def _save_state(self, state):
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.state_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2, sort_keys=True)
+
+    def upstream(self, names):
+        """Returns ``names`` plus everything they transitively depend on."""
+        todo, seen = list(names), set()
+        while todo:
+            name = todo.pop()
+            if name not in seen:
+                seen.add(name)
+                todo.extend(self.deps[name])
+        return seen
+
+    def is_stale(self, stage, state):
+        if any(not p.exists() for p in stage.outputs + stage.inputs):
+            return True
+        return state.get(stage.name) != stage.fingerprint()
+
+    def plan(self, targets=None, force=()):
+        """
+        Best-effort list of stages that would run, assuming every stale stage
+        also invalidates its dependents.
+        """
+        state = self._load_state()
+        selected = self.upstream(targets or self.stages)
+        stale = set()
+        for name in self._topological(selected):
+            stage = self.stages[name]
+            if name in force or self.deps[name] & stale or self.is_stale(stage, state):
+                stale.add(name)
+        return [name for name in self._topological(selected) if name in stale]
+
+    def _topological(self, names):
+        order, done = [], set()
+
+        def visit(name):
+            if name not in done:
+                done.add(name)
+                for dep in sorted(self.deps[name]):
+                    visit(dep)
+                order.append(name)
+
+        for name in sorted(names):
+            visit(name)
+        return order
+
+    def run(self, targets=None, force=(), workers=4):
+        state = self._load_state()
+        pending = self.upstream(targets or self.stages)
+        finished, running = set(), {}
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while pending or running:
+                ready = [n for n in sorted(pending) if self.deps[n] <= finished]
+                for name in ready:
+                    pending.discard(name)
+                    stage = self.stages[name]
+                    if name not in force and not self.is_stale(stage, state):
+                        print(f"[skip] {name}")
+                        finished.add(name)
+                        continue
+                    print(f"[run]  {name}")
+                    running[executor.submit(stage.run)] = name
+
+                if not running:
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    # Let a failure propagate, stages depending on it must not run
+                    future.result()
+                    state[name] = self.stages[name].fingerprint()
+                    self._save_state(state)
+                    finished.add(name)
+                    print(f"[done] {name}")
+
+
+def scrape_minors(html_path, out_path):
+    from src.webscraper import HTMLScrapper
+
+    HTMLScrapper.scrape_minors(html_path).to_csv(out_path, index=False)
+
+
+def scrape_courses(html_path, out_path):
+    from src.webscraper import HTMLScrapper
+
+    file_name = Path(html_path).relative_to(DATA_DIR)
+    HTMLScrapper.scrape_courses(file_name).to_csv(out_path, index=False)
+
+
+def crawl(listing_path, descriptions_path, report_path, pool_size=5):
+    from src.webscraper import crawl_cached
+
+    df = pd.read_csv(listing_path)
+    cache, report = asyncio.run(
+        crawl_cached(
+            df["url"].tolist(), Path(descriptions_path).with_suffix(".jsonl"), pool_size
+        )
+    )
+    df["markdown"] = cache.lookup(df["url"], "markdown").values
+    df.to_csv(descriptions_path, index=False)
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+
+def strip(descriptions_path, stripped_path, report_path):
+    from src.boilerplate import strip_file
+
+    strip_file(descriptions_path, stripped_path, report_path)
+
+
+def dedup(descriptions_path, duplicates_path, groups_path, threshold=0.9):
+    from src.dedup import dedup_file
+
+    dedup_file(descriptions_path, duplicates_path, threshold).to_csv(
+        groups_path, index=False
+    )
+
+
+def summarize(
+    descriptions_path,
+    report_path,
+    duplicates_path,
+    summaries_path,
+    workers=4,
+    pack_tokens=None,
+    legacy_checkpoint=None,
+):
+    from src.llm import summarize_minors
+
+    df = pd.read_csv(descriptions_path)
+    df = df[df["markdown"].notna()].reset_index(drop=True)
+    with open(report_path, "r", encoding="utf-8") as f:
+        changed_urls = json.load(f)["changed"]
+    duplicates = pd.read_csv(duplicates_path)
+
+    # Pages summarized by the scripts that predate the pipeline are not sent
+    # to the model again: their CSV checkpoint seeds an empty journal. The
+    # crawl report only decides for those, the others carry a content hash
+    journal_path = Path(summaries_path).with_suffix(".jsonl")
+    if legacy_checkpoint and Path(legacy_checkpoint).exists():
+        from src.checkpoint import CheckpointJournal
+
+        with CheckpointJournal(journal_path) as journal:
+            if not len(journal):
+                journal.import_csv(legacy_checkpoint, "summary")
+
+    summarize_minors(
+        df,
+        journal_path,
+        summaries_path,
+        workers=workers,
+        changed_urls=changed_urls,
+        representatives=dict(zip(duplicates["url"], duplicates["representative_url"])),
+        pack_tokens=pack_tokens,
+    )
+
+
+def merge(descriptions_path, table_path, merged_path):
+    from src.main import main as merge_courses
+
+    merge_courses(descriptions_path, table_path, merged_path)
+
+
+def score(summaries_path, scores_path, coverage_path, trends_text, threshold):
+    import analysis
+
+    df_courses, _, ai_trend_list_clean = analysis.load_and_preprocess_data(
+        summaries_path, trends_text
+    )
+    df_courses, trend_coverage_matrix, _ = analysis.compute_similarity(
+        df_courses,
+        ai_trend_list_clean,
+        threshold,
+        analysis.EMBEDDING_CACHE_DIR / Path(summaries_path).stem,
+    )
+    df_courses.to_pickle(scores_path)
+    trend_coverage_matrix.to_pickle(coverage_path)
+
+
+def report(scores_path, coverage_path, report_path, trends_text, threshold):
+    import analysis
+
+    ai_trend_list = [trend.strip() for trend in trends_text.strip().split(",")]
+    analysis.generate_report(
+        pd.read_pickle(scores_path),
+        pd.read_pickle(coverage_path),
+        ai_trend_list,
+        threshold,
+        Path(report_path).parent,
+    )
+
+
+def build_stages(
+    trends_text,
+    threshold,
+    dataset="minors",
+    crawl_pool=5,
+    workers=4,
+    dedup_threshold=0.9,
+    pack_tokens=None,
+):
+    stages = []
+    for kind, directory, legacy_checkpoint in (
+        ("minors", MINORS_DIR, MINORS_DIR / "minors_checkpoint.csv"),
+        ("courses", COURSES_DIR, COURSES_DIR / "course_checkpoint.csv"),
+    ):
+        listing = directory / f"{kind}.csv"
+        descriptions = directory / f"{kind}_descriptions.csv"
+        crawl_report = directory / f"{kind}_crawl_report.json"
+        stripped = directory / f"{kind}_descriptions_stripped.csv"
+        duplicates = directory / f"{kind}_duplicates.csv"
+        summaries = directory / f"{kind}_summaries.csv"
+        scrape = scrape_minors if kind == "minors" else scrape_courses
+        stages += [
+            Stage(f"scrape_{kind}", scrape, [directory / f"{kind}.html"], [listing]),
+            Stage(
+                f"crawl_{kind}",
+                crawl,
+                [listing],
+                [descriptions, crawl_report],
+                options={"pool_size": crawl_pool},
+            ),
+            Stage(
+                f"strip_{kind}",
+                strip,
+                [descriptions],
+                [stripped, directory / f"{kind}_boilerplate_report.csv"],
+            ),
+            Stage(
+                f"dedup_{kind}",
+                dedup,
+                [stripped],
+                [duplicates, directory / f"{kind}_duplicate_groups.csv"],
+                {"threshold": dedup_threshold},
+            ),
+            Stage(
+                f"summarize_{kind}",
+                summarize,
+                [stripped, crawl_report, duplicates],
+                [summaries],
+                {
+                    "pack_tokens": pack_tokens,
+                    "legacy_checkpoint": str(legacy_checkpoint),
+                },
+                {"workers": workers},
+            ),
+        ]
+
+    # Courses are scored with the enrichment of the full course table joined
+    # onto their summaries
+    merged = COURSES_DIR / "merged.csv"
+    scored = MINORS_DIR / "minors_summaries.csv" if dataset == "minors" else merged
+    scores = SCORES_DIR / f"{dataset}_scores.pkl"
+    coverage = SCORES_DIR / f"{dataset}_trend_coverage.pkl"
+    trend_params = {"trends_text": trends_text, "threshold": threshold}
+    stages += [
+        Stage(
+            "merge_courses",
+            merge,
+            [
+                COURSES_DIR / "courses_summaries.csv",
+                COURSES_DIR / "courses_full_table_laurie.csv",
+            ],
+            [merged],
+        ),
+        Stage(
+            "score",
+            score,
+            [scored],
+            [scores, coverage],
+            trend_params,
+        ),
+        Stage(
+            "report",
+            report,
+            [scores, coverage],
+            [OUTPUT_DIR / "AI_Trends_Coverage_Report.pdf"],
+            trend_params,
+        ),
+    ]
+    return stages
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run the gap analysis pipeline, skipping up-to-date stages."
+    )
+    parser.add_argument("targets", nargs="*", help="stages to bring up to date")
+    parser.add_argument("--trends-file", type=Path, help="comma separated trend list")
+    parser.add_argument("--threshold", type=float, default=None)
+    parser.add_argument("--dataset", choices=("minors", "courses"), default="minors")
+    parser.add_argument("--force", nargs="*", default=(), help="stages to always run")
+    parser.add_argument("--workers", type=int, default=4, help="parallel stages")
+    parser.add_argument("--llm-workers", type=int, default=4)
+    parser.add_argument("--crawl-pool", type=int, default=5)
+    parser.add_argument(
+        "--dedup-threshold",
+        type=float,
+        default=0.9,
+        help="shingle similarity above which pages share one summary",
+    )
+    parser.add_argument(
+        "--pack-tokens",
+        type=int,
+        help="summarize several pages per LLM request, up to this prompt size",
+    )
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.trends_file:
+        trends_text = args.trends_file.read_text(encoding="utf-8")
+    else:
+        from analysis import AI_TRENDS_TEXT as trends_text
+    if args.threshold is None:
+        from analysis import COVERAGE_THRESHOLD as threshold
+    else:
+        threshold = args.threshold
+
+    pipeline = Pipeline(
+        build_stages(
+            trends_text,
+            threshold,
+            args.dataset,
+            args.crawl_pool,
+            args.llm_workers,
+            args.dedup_threshold,
+            args.pack_tokens,
+        )
+    )
+    unknown = set(args.targets) - set(pipeline.stages)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+
+    if args.dry_run:
+        for name in pipeline.plan(args.targets, args.force):
+            print(name)
+        return
+    try:
+        pipeline.run(args.targets, args.force, args.workers)
+    finally:
+        METRICS.export("pipeline")
+
+
+if __name__ == "__main__":
+    main()
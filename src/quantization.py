@@ -0,0 +1,103 @@
+"""
+Checks that a faster embedding backend keeps the fp32 coverage decisions.
+
+Encodes the course summaries and trends with the fp32 torch model and with
+the candidate backend, scores both at the configured threshold and reports
+the encode speedup, how many course x trend decisions differ and which
+courses would flip between covered and not covered.
+
+    python -m src.quantization data/minors/minors_summaries.csv --backend int8
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from src.embeddings import MODEL_NAME, check_backend, get_model, model_id
+from src.scoring import score
+
+
+def timed_encode(model, texts, batch_size=32):
+    model = get_model(model)
+    start = time.perf_counter()
+    vectors = model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+    return vectors, time.perf_counter() - start
+
+
+def compare_backends(
+    course_texts, trend_texts, coverage_threshold, backend, model_name=MODEL_NAME
+):
+    baseline = model_id(model_name, "torch")
+    candidate = model_id(model_name, backend)
+
+    # Warm both models up so loading time does not count as encode time
+    timed_encode(baseline, course_texts[:8])
+    timed_encode(candidate, course_texts[:8])
+
+    base_courses, base_seconds = timed_encode(baseline, course_texts)
+    cand_courses, cand_seconds = timed_encode(candidate, course_texts)
+    base_scores = score(
+        base_courses, get_model(baseline).encode(trend_texts), coverage_threshold
+    )
+    cand_scores = score(
+        cand_courses, get_model(candidate).encode(trend_texts), coverage_threshold
+    )
+
+    base_covered = base_scores.max_similarity >= coverage_threshold
+    cand_covered = cand_scores.max_similarity >= coverage_threshold
+    return {
+        "backend": backend,
+        "speedup": base_seconds / cand_seconds,
+        "texts_per_second": len(course_texts) / cand_seconds,
+        "decisions_changed": int((base_scores.coverage != cand_scores.coverage).nnz),
+        "decisions_total": base_scores.coverage.shape[0]
+        * base_scores.coverage.shape[1],
+        "flipped_courses": np.flatnonzero(base_covered != cand_covered).tolist(),
+        "max_score_delta": float(
+            np.abs(base_scores.max_similarity - cand_scores.max_similarity).max()
+        ),
+    }
+
+
+def main(argv=None):
+    import analysis
+
+    parser = argparse.ArgumentParser(
+        description="Compare an embedding backend against the fp32 baseline."
+    )
+    parser.add_argument("filepath")
+    parser.add_argument("--backend", choices=("int8", "onnx"), default="int8")
+    parser.add_argument("--threshold", type=float, default=analysis.COVERAGE_THRESHOLD)
+    args = parser.parse_args(argv)
+    # Fail before the data is loaded and the baseline encoded
+    check_backend(args.backend)
+
+    df_courses, _, ai_trend_list_clean = analysis.load_and_preprocess_data(
+        args.filepath, analysis.AI_TRENDS_TEXT
+    )
+    result = compare_backends(
+        df_courses["clean"].tolist(), ai_trend_list_clean, args.threshold, args.backend
+    )
+
+    print(f"Backend: {result['backend']}")
+    print(f"Encode speedup vs fp32: {result['speedup']:.2f}x")
+    print(f"Throughput: {result['texts_per_second']:.1f} texts/s")
+    print(
+        f"Coverage decisions changed: {result['decisions_changed']} "
+        f"of {result['decisions_total']}"
+    )
+    print(f"Max similarity delta: {result['max_score_delta']:.4f}")
+
+    names = df_courses["name"].tolist()
+    for i in result["flipped_courses"]:
+        print(f"  flipped: {names[i]}")
+    if result["flipped_courses"]:
+        raise SystemExit(
+            f"{len(result['flipped_courses'])} courses change coverage with {args.backend}"
+        )
+    print("Covered courses are identical to the fp32 baseline")
+
+
+if __name__ == "__main__":
+    main()
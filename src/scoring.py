@@ -0,0 +1,127 @@
+"""
+Block-wise cosine scoring of courses against trends.
+
+Works on dense embeddings and on sparse TF-IDF matrices alike. Similarities
+are computed ``block_size`` course rows at a time, so memory stays bounded
+by ``block_size x n_trends`` no matter how large the catalog is. Coverage is
+kept as a sparse boolean CSR matrix.
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+
+def normalize_rows(x):
+    """L2-normalizes the rows of a dense array or sparse matrix."""
+    if sparse.issparse(x):
+        x = sparse.csr_matrix(x, dtype=np.float32)
+        norms = np.sqrt(np.asarray(x.multiply(x).sum(axis=1)).ravel())
+        return sparse.diags(1 / np.clip(norms, 1e-12, None)) @ x
+    x = np.asarray(x, dtype=np.float32)
+    return x / np.clip(np.linalg.norm(x, axis=1, keepdims=True), 1e-12, None)
+
+
+def iter_similarity_blocks(course_vectors, trend_vectors, block_size=4096):
+    """Yields ``(start, block)`` with the dense cosine similarities of each row block."""
+    trend_vectors = normalize_rows(trend_vectors)
+    trend_vectors_t = trend_vectors.T
+    for start in range(0, course_vectors.shape[0], block_size):
+        block = normalize_rows(course_vectors[start : start + block_size])
+        block = block @ trend_vectors_t
+        if sparse.issparse(block):
+            block = block.toarray()
+        yield start, np.asarray(block, dtype=np.float32)
+
+
+def top_k(block, k):
+    """Indices and scores of the ``k`` largest values per row, best first."""
+    k = min(k, block.shape[1])
+    if k == 0:
+        return np.empty((len(block), 0), dtype=np.intp), np.empty((len(block), 0))
+    idx = np.argpartition(-block, k - 1, axis=1)[:, :k]
+    part = np.take_along_axis(block, idx, axis=1)
+    order = np.argsort(-part, axis=1)
+    return np.take_along_axis(idx, order, axis=1), np.take_along_axis(
+        part, order, axis=1
+    )
+
+
+class ScoreResult:
+    def __init__(self, max_similarity, coverage, top_indices, top_scores):
+        self.max_similarity = max_similarity
+        self.coverage = coverage
+        self.top_indices = top_indices
+        self.top_scores = top_scores
+
+    def covered_trends(self, labels):
+        """Per course, the list of ``labels`` whose trend is covered."""
+        labels = np.asarray(labels, dtype=object)
+        coverage = self.coverage.tocsr()
+        if coverage.shape[0] == 0:
+            return []
+        groups = np.split(labels[coverage.indices], coverage.indptr[1:-1])
+        return [group.tolist() for group in groups]
+
+    def coverage_frame(self, labels, index=None):
+        """The coverage matrix as a sparse boolean DataFrame."""
+        return pd.DataFrame.sparse.from_spmatrix(
+            self.coverage, index=index, columns=list(labels)
+        )
+
+
+def iter_pooled_similarity_blocks(
+    passage_vectors, owners, trend_vectors, block_size=4096
+):
+    """
+    Like ``iter_similarity_blocks`` for courses split into passages: each
+    course scores the maximum over its passages. ``owners`` gives the course
+    of every passage and must be sorted, with every course owning at least
+    one passage.
+    """
+    owners = np.asarray(owners)
+    n_courses = int(owners[-1]) + 1 if len(owners) else 0
+    starts = np.searchsorted(owners, np.arange(n_courses + 1))
+    trend_vectors_t = normalize_rows(trend_vectors).T
+    for start in range(0, n_courses, block_size):
+        stop = min(start + block_size, n_courses)
+        p0, p1 = starts[start], starts[stop]
+        block = normalize_rows(passage_vectors[p0:p1]) @ trend_vectors_t
+        yield start, np.maximum.reduceat(
+            np.asarray(block, dtype=np.float32), starts[start:stop] - p0, axis=0
+        )
+
+
+def score_blocks(blocks, n_trends, coverage_threshold, top=5):
+    """Builds a ``ScoreResult`` from ``(start, block)`` similarity blocks."""
+    max_similarity, coverage, top_indices, top_scores = [], [], [], []
+    for _, block in blocks:
+        max_similarity.append(block.max(axis=1, initial=-1.0))
+        coverage.append(sparse.csr_matrix(block >= coverage_threshold))
+        indices, scores = top_k(block, top)
+        top_indices.append(indices)
+        top_scores.append(scores)
+
+    if not coverage:
+        return ScoreResult(
+            np.empty(0, dtype=np.float32),
+            sparse.csr_matrix((0, n_trends), dtype=bool),
+            np.empty((0, min(top, n_trends)), dtype=np.intp),
+            np.empty((0, min(top, n_trends)), dtype=np.float32),
+        )
+    return ScoreResult(
+        np.concatenate(max_similarity),
+        sparse.vstack(coverage, format="csr"),
+        np.concatenate(top_indices),
+        np.concatenate(top_scores),
+    )
+
+
+def score(course_vectors, trend_vectors, coverage_threshold, top=5, block_size=4096):
+    """
+    Scores every course against every trend and returns a ``ScoreResult``
+    with the best similarity per course, the sparse coverage matrix
+    (similarity >= ``coverage_threshold``) and the ``top`` trends per course.
+    """
+    blocks = iter_similarity_blocks(course_vectors, trend_vectors, block_size)
+    return score_blocks(blocks, trend_vectors.shape[0], coverage_threshold, top)
@@ -0,0 +1,154 @@
+"""
+Answers "which courses cover this topic" from a persisted embedding index.
+
+``build`` embeds the summaries of the given datasets once and stores the
+normalized vectors with the course names, URLs and kinds. ``query`` only
+encodes the query text (cached on disk as well) and ranks the catalog with
+an exact NumPy dot product, without touching the catalog CSVs.
+
+    python -m src.search build data/minors/minors_summaries.csv:minor
+    python -m src.search query "computer vision in healthcare" -k 10
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+
+from src.config import DATA_DIR, EMBEDDING_CACHE_DIR
+from src.embeddings import EmbeddingCache, clean_text, lazy_encoder, model_id
+from src.scoring import normalize_rows, top_k
+
+INDEX_DIR = DATA_DIR / "search_index"
+# Query embeddings kept on disk, every new query rewrites them all
+QUERY_CACHE_SIZE = 1000
+
+
+def build_index(datasets, index_dir=INDEX_DIR, model=None):
+    """
+    Builds the index from ``datasets``, a list of ``(path, kind)`` pairs
+    pointing at CSVs or catalogs with ``name``, ``url`` and ``summary``.
+    """
+    from src.storage import load_table
+
+    items, texts = [], []
+    for path, kind in datasets:
+        df = load_table(path, ["name", "url", "summary"])
+        df = df[df["summary"].notna()]
+        urls = df["url"] if "url" in df.columns else [None] * len(df)
+        for name, url, summary in zip(df["name"], urls, df["summary"]):
+            items.append(
+                {
+                    "name": " ".join(str(name).split()),
+                    "url": url if isinstance(url, str) else None,
+                    "kind": kind,
+                }
+            )
+            texts.append(clean_text(str(summary)))
+
+    model = model or model_id()
+    cache = EmbeddingCache(EMBEDDING_CACHE_DIR / "search", model)
+    vectors = normalize_rows(cache.encode(texts, lazy_encoder(model)))
+
+    index_dir = Path(index_dir)
+    index_dir.mkdir(parents=True, exist_ok=True)
+    np.save(index_dir / "vectors.npy", vectors)
+    with open(index_dir / "items.json", "w", encoding="utf-8") as f:
+        json.dump({"model": model, "items": items}, f, ensure_ascii=False)
+    return len(items)
+
+
+class SearchIndex:
+    def __init__(self, index_dir=INDEX_DIR, query_cache_size=QUERY_CACHE_SIZE):
+        index_dir = Path(index_dir)
+        with open(index_dir / "items.json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.model = meta["model"]
+        self.items = meta["items"]
+        self.kinds = np.array([item["kind"] for item in self.items])
+        self.vectors = np.load(index_dir / "vectors.npy", mmap_mode="r")
+        self._query_cache = EmbeddingCache(EMBEDDING_CACHE_DIR / "queries", self.model)
+        self.query_cache_size = query_cache_size
+        self._encode = lazy_encoder(self.model)
+
+    def encode(self, queries):
+        texts = [clean_text(q) for q in queries]
+        return normalize_rows(
+            self._query_cache.encode(
+                texts, self._encode, evict=False, max_entries=self.query_cache_size
+            )
+        )
+
+    def search_vectors(self, query_vectors, k=10, kind=None):
+        scores = np.asarray(query_vectors, dtype=np.float32) @ self.vectors.T
+        if kind is not None:
+            scores[:, self.kinds != kind] = -np.inf
+        indices, top_scores = top_k(scores, k)
+        return [
+            [
+                {**self.items[i], "score": float(s)}
+                for i, s in zip(row_indices, row_scores)
+                if np.isfinite(s)
+            ]
+            for row_indices, row_scores in zip(indices, top_scores)
+        ]
+
+    def search(self, query, k=10, kind=None):
+        return self.search_vectors(self.encode([query]), k, kind)[0]
+
+
+def parse_dataset(text):
+    """Parses a ``PATH:KIND`` command line argument into ``(path, kind)``."""
+    path, sep, kind = text.rpartition(":")
+    # A bare path, or a Windows drive letter, leaves no kind after the colon
+    if not sep or not path or not kind or "/" in kind or "\\" in kind:
+        raise argparse.ArgumentTypeError(
+            f"expected PATH:KIND, e.g. data/minors/minors.csv:minor, got {text!r}"
+        )
+    return path, kind
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find courses covering a topic.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="embed datasets into the index")
+    build.add_argument(
+        "datasets",
+        nargs="+",
+        type=parse_dataset,
+        help="PATH:KIND, e.g. data/minors/minors.csv:minor",
+    )
+    build.add_argument("--index-dir", type=Path, default=INDEX_DIR)
+
+    query = commands.add_parser("query", help="rank courses for a topic")
+    query.add_argument("text")
+    query.add_argument("-k", type=int, default=10)
+    query.add_argument("--kind", help="only return this kind, e.g. minor")
+    query.add_argument("--index-dir", type=Path, default=INDEX_DIR)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        print(f"Indexed {build_index(args.datasets, args.index_dir)} items")
+        return
+
+    t0 = time.perf_counter()
+    index = SearchIndex(args.index_dir)
+    t1 = time.perf_counter()
+    query_vectors = index.encode([args.text])
+    t2 = time.perf_counter()
+    results = index.search_vectors(query_vectors, args.k, args.kind)[0]
+    t3 = time.perf_counter()
+
+    for rank, item in enumerate(results, 1):
+        print(f"{rank:>3}. {item['score']:.3f}  [{item['kind']}] {item['name']}")
+    print(
+        f"\nload {1000 * (t1 - t0):.1f} ms, encode {1000 * (t2 - t1):.1f} ms, "
+        f"search {1000 * (t3 - t2):.2f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
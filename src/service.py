@@ -0,0 +1,278 @@
+"""
+Long-running scoring service for draft course descriptions.
+
+Keeps the embedding model, the trend embeddings and the search index warm.
+Concurrent requests are queued and micro-batched into a single ``encode``
+call (up to ``max_batch`` texts or ``max_wait_ms`` of waiting), then scored
+against every trend and matched to the nearest existing courses.
+
+    python -m src.service --port 8000
+    curl -X POST localhost:8000/score -d '{"text": "..."}'
+    curl localhost:8000/stats
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from collections import deque
+from http import HTTPStatus
+
+import numpy as np
+
+from src.embeddings import clean_text, get_model, model_id
+from src.scoring import normalize_rows
+
+
+class Scorer:
+    def __init__(
+        self,
+        ai_trends_text,
+        coverage_threshold,
+        index=None,
+        model=None,
+        max_batch=32,
+        max_wait_ms=5,
+        neighbours=5,
+    ):
+        self.model = model or model_id()
+        self.trends = [t.strip() for t in ai_trends_text.strip().split(",")]
+        self.trends = [t for t in self.trends if t]
+        self.coverage_threshold = coverage_threshold
+        self.index = index
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.neighbours = neighbours
+
+        self.queue = asyncio.Queue()
+        self.latencies = deque(maxlen=10000)
+        self.batch_sizes = deque(maxlen=10000)
+        self.started = time.monotonic()
+        self.requests = 0
+        self.errors = 0
+
+        # Load the model and encode the trends once, up front
+        self.trend_vectors = normalize_rows(self._encode(self.trends))
+
+    def _encode(self, texts):
+        return get_model(self.model).encode(
+            [clean_text(t) for t in texts], batch_size=len(texts), convert_to_numpy=True
+        )
+
+    def _score_batch(self, texts):
+        vectors = normalize_rows(self._encode(texts))
+        similarities = vectors @ self.trend_vectors.T
+        nearest = (
+            self.index.search_vectors(vectors, self.neighbours)
+            if self.index is not None
+            else [[] for _ in texts]
+        )
+
+        results = []
+        for row, neighbours in zip(similarities, nearest):
+            results.append(
+                {
+                    "ai_trend_similarity": float(row.max(initial=-1.0)),
+                    "trend_scores": dict(zip(self.trends, row.round(4).tolist())),
+                    "covered_trends": [
+                        t
+                        for t, s in zip(self.trends, row)
+                        if s >= self.coverage_threshold
+                    ],
+                    "nearest_courses": neighbours,
+                }
+            )
+        return results
+
+    async def score(self, text):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((text, future, time.perf_counter()))
+        return await future
+
+    async def run_batcher(self):
+        while True:
+            batch = [await self.queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            texts = [text for text, _, _ in batch]
+            try:
+                # Encoding releases the GIL, keep the event loop responsive
+                results = await asyncio.to_thread(self._score_batch, texts)
+            except Exception:
+                # Score the texts one by one, so a text that breaks the batch
+                # only fails its own request
+                results = [await self._score_alone(text) for text in texts]
+
+            now = time.perf_counter()
+            self.batch_sizes.append(len(batch))
+            for (_, future, received), result in zip(batch, results):
+                self.latencies.append(now - received)
+                self.requests += 1
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    self.errors += 1
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    async def _score_alone(self, text):
+        try:
+            return (await asyncio.to_thread(self._score_batch, [text]))[0]
+        except Exception as e:
+            return e
+
+    def stats(self):
+        latencies = np.asarray(self.latencies) * 1000
+        uptime = time.monotonic() - self.started
+        stats = {
+            "requests": self.requests,
+            "errors": self.errors,
+            "uptime_s": round(uptime, 1),
+            "throughput_rps": round(self.requests / uptime, 2) if uptime else 0.0,
+            "mean_batch_size": (
+                round(float(np.mean(self.batch_sizes)), 2) if self.batch_sizes else 0.0
+            ),
+        }
+        if len(latencies):
+            for p in (50, 95, 99):
+                stats[f"latency_p{p}_ms"] = round(float(np.percentile(latencies, p)), 2)
+        return stats
+
+
+async def read_request(reader):
+    """
+    Reads one request as ``(method, path, headers, body)``, ``None`` at the
+    end of the connection. Raises ``ValueError`` for a malformed request.
+    """
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    method, path, _ = request_line.decode("latin-1").split(" ", 2)
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    body = await reader.readexactly(int(headers.get("content-length", 0)))
+    return method, path, headers, body
+
+
+def write_response(writer, status, payload):
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    writer.write(
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+    )
+
+
+async def handle(scorer, reader, writer):
+    try:
+        # Keep-alive: serve requests until the client closes the connection
+        while True:
+            try:
+                request = await read_request(reader)
+            except ValueError:
+                # The rest of the stream cannot be framed, answer and hang up
+                write_response(
+                    writer, HTTPStatus.BAD_REQUEST, {"error": "malformed request"}
+                )
+                await writer.drain()
+                break
+            if request is None:
+                break
+            method, path, headers, body = request
+            if method == "GET" and path == "/stats":
+                write_response(writer, HTTPStatus.OK, scorer.stats())
+            elif method == "POST" and path == "/score":
+                try:
+                    text = json.loads(body)["text"]
+                except (ValueError, KeyError, TypeError):
+                    text = None
+                if not isinstance(text, str) or not text.strip():
+                    write_response(
+                        writer,
+                        HTTPStatus.BAD_REQUEST,
+                        {"error": 'expected {"text": "<non-empty string>"}'},
+                    )
+                else:
+                    try:
+                        result = await scorer.score(text)
+                    except Exception as e:
+                        write_response(
+                            writer,
+                            HTTPStatus.INTERNAL_SERVER_ERROR,
+                            {"error": f"scoring failed: {type(e).__name__}"},
+                        )
+                    else:
+                        write_response(writer, HTTPStatus.OK, result)
+            else:
+                write_response(writer, HTTPStatus.NOT_FOUND, {"error": "not found"})
+            await writer.drain()
+            if headers.get("connection", "").lower() == "close":
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(scorer, host="127.0.0.1", port=8000):
+    batcher = asyncio.create_task(scorer.run_batcher())
+    server = await asyncio.start_server(lambda r, w: handle(scorer, r, w), host, port)
+    print(f"Scoring service listening on http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        batcher.cancel()
+
+
+def main(argv=None):
+    import analysis
+    from src.search import INDEX_DIR, SearchIndex
+
+    parser = argparse.ArgumentParser(description="Resident AI trend scoring service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--threshold", type=float, default=analysis.COVERAGE_THRESHOLD)
+    parser.add_argument("--index-dir", default=INDEX_DIR)
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=5)
+    args = parser.parse_args(argv)
+
+    try:
+        index = SearchIndex(args.index_dir)
+    except FileNotFoundError:
+        print("No search index found, nearest courses are disabled")
+        index = None
+
+    async def run():
+        scorer = Scorer(
+            analysis.AI_TRENDS_TEXT,
+            args.threshold,
+            index,
+            model=index.model if index is not None else None,
+            max_batch=args.max_batch,
+            max_wait_ms=args.max_wait_ms,
+        )
+        await serve(scorer, args.host, args.port)
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Columnar on-disk format for the catalog datasets.
+
+A catalog is a directory holding ``table.parquet`` with the small columns and
+one Arrow IPC file per large text column (``markdown`` by default). Readers
+only pay for the columns they ask for; text columns are memory-mapped.
+
+    python -m src.storage data/gap_analysis.csv data/minors/minors_checkpoint.csv
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+import pandas as pd
+
+from src.config import DATA_DIR
+
+CATALOG_DIR = DATA_DIR / "catalog"
+TEXT_COLUMNS = ("markdown",)
+
+
+def write_catalog(df, path, text_columns=TEXT_COLUMNS):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    text_columns = [c for c in text_columns if c in df.columns]
+
+    table = pa.Table.from_pandas(df.drop(columns=text_columns), preserve_index=False)
+    pq.write_table(table, path / "table.parquet")
+
+    for column in text_columns:
+        text = pa.table(
+            {column: pa.array(df[column].astype(object), pa.large_string())}
+        )
+        with pa.OSFile(str(path / f"{column}.arrow"), "wb") as sink:
+            with pa.ipc.new_file(sink, text.schema) as writer:
+                writer.write_table(text)
+
+    with open(path / "columns.json", "w", encoding="utf-8") as f:
+        json.dump({"columns": list(df.columns), "text_columns": text_columns}, f)
+
+
+def catalog_columns(path):
+    with open(Path(path) / "columns.json", "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def read_text_column(path, column):
+    """Memory-maps a single text column as a pyarrow array."""
+    import pyarrow as pa
+
+    source = pa.memory_map(str(Path(path) / f"{column}.arrow"), "r")
+    return pa.ipc.open_file(source).read_all().column(column)
+
+
+def read_catalog(path, columns=None):
+    """Reads ``columns`` (all by default) of the catalog at ``path``."""
+    import pyarrow.parquet as pq
+
+    meta = catalog_columns(path)
+    columns = meta["columns"] if columns is None else list(columns)
+    text_columns = [c for c in columns if c in meta["text_columns"]]
+    table_columns = [c for c in columns if c not in text_columns]
+
+    df = pq.read_table(Path(path) / "table.parquet", columns=table_columns)
+    df = df.to_pandas()
+    for column in text_columns:
+        df[column] = read_text_column(path, column).to_pandas()
+    return df[columns]
+
+
+def load_table(path, columns=None):
+    """
+    Loads a dataset from either a catalog directory or a CSV file, reading
+    only the ``columns`` that exist in it.
+    """
+    path = Path(path)
+    if path.is_dir():
+        available = catalog_columns(path)["columns"]
+        if columns is not None:
+            columns = [c for c in available if c in columns]
+        return read_catalog(path, columns)
+
+    usecols = None if columns is None else lambda c: c in columns
+    return pd.read_csv(path, usecols=usecols)
+
+
+def convert_csv(csv_path, out_path=None, **read_csv_kwargs):
+    out_path = Path(out_path or CATALOG_DIR / Path(csv_path).stem)
+    write_catalog(pd.read_csv(csv_path, **read_csv_kwargs), out_path)
+    return out_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert CSV datasets to catalogs.")
+    parser.add_argument("csv_paths", nargs="+", type=Path)
+    parser.add_argument("--out-dir", type=Path, default=CATALOG_DIR)
+    args = parser.parse_args(argv)
+
+    for csv_path in args.csv_paths:
+        out_path = convert_csv(csv_path, args.out_dir / csv_path.stem)
+        print(f"Converted {csv_path} -> {out_path}")
+
+
+if __name__ == "__main__":
+    main()
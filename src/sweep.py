@@ -0,0 +1,285 @@
+"""
+Threshold and trend-set sensitivity from a single scoring pass.
+
+Courses are scored once per method (embeddings and/or TF-IDF) against the
+union of all trend sets. Every similarity block is bucketed against the
+sorted threshold grid and only the bucket counts are kept; reverse
+cumulative sums then give, for all thresholds at once, how many courses are
+covered, how many courses cover each trend and which trends nobody covers.
+A trend set is just a subset of the trend columns, so comparing trend lists
+costs no extra encoding either.
+
+Each method scores the inputs of its own single-run report: embeddings as
+``analysis.py`` does, one column per trend, and TF-IDF as
+``src/analysis.py`` does, on the boilerplate-stripped markdown against the
+whole trend text, so there every trend set is a single column. The
+``default`` trend set and the marked threshold are those of the report.
+
+    python -m src.sweep data/minors/minors_checkpoint.csv --methods embedding tfidf
+    python -m src.sweep data/minors/minors_checkpoint.csv --trend-set health=health.txt
+"""
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.config import EMBEDDING_CACHE_DIR, OUTPUT_DIR
+from src.scoring import iter_similarity_blocks
+
+METHODS = ("embedding", "tfidf")
+
+
+def method_defaults(method):
+    """The trend text and coverage threshold of ``method``'s single-run report."""
+    if method == "embedding":
+        import analysis
+    else:
+        from src import analysis
+    return analysis.AI_TRENDS_TEXT, analysis.COVERAGE_THRESHOLD
+
+
+def parse_trends(text):
+    trends = [t.strip() for t in text.strip().split(",")]
+    return [t for t in trends if t]
+
+
+class SweepResult:
+    def __init__(self, thresholds, n_courses, covered_courses, trend_counts):
+        self.thresholds = thresholds
+        self.n_courses = n_courses
+        # Per trend set: courses covering at least one of its trends, (T,)
+        self.covered_courses = covered_courses
+        # Courses covering each trend, (T, n_trends)
+        self.trend_counts = trend_counts
+
+
+def _at_least(hist):
+    """Turns bucket counts (T + 1, ...) into counts >= each threshold (T, ...)."""
+    return np.cumsum(hist[::-1], axis=0)[::-1][1:]
+
+
+def sweep_blocks(blocks, n_trends, thresholds, trend_sets):
+    """
+    Evaluates every threshold from ``(start, block)`` similarity blocks.
+    ``trend_sets`` maps a name to the column indices of its trends.
+    """
+    thresholds = np.unique(np.asarray(thresholds, dtype=np.float64))
+    n_buckets = len(thresholds) + 1
+    trend_hist = np.zeros((n_buckets, n_trends), dtype=np.int64)
+    set_hist = {name: np.zeros(n_buckets, dtype=np.int64) for name in trend_sets}
+    n_courses = 0
+
+    for _, block in blocks:
+        n_courses += len(block)
+        # Bucket b holds scores that reach the first b thresholds
+        buckets = np.searchsorted(thresholds, block, side="right")
+        trend_index = np.broadcast_to(np.arange(n_trends), buckets.shape)
+        trend_hist += np.bincount(
+            (buckets * n_trends + trend_index).ravel(),
+            minlength=n_buckets * n_trends,
+        ).reshape(n_buckets, n_trends)
+        for name, columns in trend_sets.items():
+            best = buckets[:, columns].max(axis=1, initial=0)
+            set_hist[name] += np.bincount(best, minlength=n_buckets)
+
+    return SweepResult(
+        thresholds,
+        n_courses,
+        {name: _at_least(hist) for name, hist in set_hist.items()},
+        _at_least(trend_hist),
+    )
+
+
+def sensitivity_tables(result, trends, trend_sets, method):
+    """
+    Returns the summary table (one row per trend set and threshold) and the
+    per-trend table (one row per trend and threshold).
+    """
+    trends = np.asarray(trends, dtype=object)
+    n = max(result.n_courses, 1)
+    rows = []
+    for name, columns in trend_sets.items():
+        counts = result.trend_counts[:, columns]
+        for k, threshold in enumerate(result.thresholds):
+            uncovered = trends[columns][counts[k] == 0]
+            rows.append(
+                {
+                    "method": method,
+                    "trend_set": name,
+                    "threshold": round(float(threshold), 6),
+                    "covered_courses": int(result.covered_courses[name][k]),
+                    "coverage_rate": result.covered_courses[name][k] / n,
+                    "covered_trends": int((counts[k] > 0).sum()),
+                    "uncovered_trends": ", ".join(uncovered),
+                }
+            )
+    summary = pd.DataFrame(rows)
+
+    per_trend = pd.DataFrame(
+        result.trend_counts, index=result.thresholds.round(6), columns=trends
+    )
+    per_trend = per_trend.rename_axis("threshold").reset_index()
+    per_trend = per_trend.melt("threshold", var_name="trend", value_name="courses")
+    per_trend.insert(0, "method", method)
+    per_trend["coverage_rate"] = per_trend["courses"] / n
+    return summary, per_trend
+
+
+def embedding_blocks(filepath, trend_sets_text, cache_dir, model=None):
+    """
+    Similarity blocks of every course to every trend, as ``analysis.py``
+    scores them, with the trend names and the columns of every trend set.
+    """
+    import analysis
+    from src.embeddings import EmbeddingCache, clean_text, lazy_encoder, model_id
+
+    # The first set goes through the regular preprocessing (translation,
+    # filtering), the others only add trend columns
+    first = next(iter(trend_sets_text.values()))
+    df_courses, _, _ = analysis.load_and_preprocess_data(filepath, first)
+    texts = df_courses["clean"].tolist()
+
+    trends, trend_sets = [], {}
+    for name, text in trend_sets_text.items():
+        columns = []
+        for trend in parse_trends(text):
+            if trend not in trends:
+                trends.append(trend)
+            columns.append(trends.index(trend))
+        trend_sets[name] = np.asarray(columns, dtype=np.intp)
+
+    model = model or model_id()
+    cache = EmbeddingCache(cache_dir, model)
+    vectors = cache.encode(
+        list(texts) + [clean_text(t) for t in trends], lazy_encoder(model)
+    )
+    blocks = iter_similarity_blocks(vectors[: len(texts)], vectors[len(texts) :])
+    return blocks, trends, trend_sets
+
+
+def tfidf_blocks(filepath, trend_sets_text):
+    """
+    The similarity of every course to every trend set, each scored by
+    ``src.analysis.tfidf_similarity`` on the same inputs as its report.
+    """
+    from src.analysis import load_courses, tfidf_similarity
+
+    df_courses = load_courses(filepath)
+    similarity = np.column_stack(
+        [tfidf_similarity(df_courses, text, 0.0) for text in trend_sets_text.values()]
+    )
+    names = list(trend_sets_text)
+    trend_sets = {name: np.array([i], dtype=np.intp) for i, name in enumerate(names)}
+    return [(0, similarity)], names, trend_sets
+
+
+def plot_sensitivity(summary, path):
+    import matplotlib.pyplot as plt
+
+    fig, (ax_rate, ax_trends) = plt.subplots(1, 2, figsize=(14, 6))
+    for (method, trend_set), group in summary.groupby(["method", "trend_set"]):
+        label = f"{method} / {trend_set}"
+        ax_rate.plot(group["threshold"], group["coverage_rate"], label=label)
+        ax_trends.plot(group["threshold"], group["covered_trends"], label=label)
+    for method in summary["method"].unique():
+        _, threshold = method_defaults(method)
+        for ax in (ax_rate, ax_trends):
+            ax.axvline(threshold, color="grey", linestyle="--", linewidth=0.8)
+
+    ax_rate.set_title("Share of courses covering at least one trend")
+    ax_rate.set_ylabel("Coverage rate")
+    ax_trends.set_title("Trends covered by at least one course")
+    ax_trends.set_ylabel("Covered trends")
+    for ax in (ax_rate, ax_trends):
+        ax.set_xlabel("Coverage threshold")
+        ax.grid(linestyle="--", alpha=0.7)
+        ax.legend()
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+
+
+def run_sweep(
+    filepath,
+    thresholds,
+    methods=METHODS,
+    extra_trend_sets=None,
+    output_dir=OUTPUT_DIR,
+    model=None,
+):
+    """
+    Scores ``filepath`` once per method and writes ``sensitivity.csv``,
+    ``sensitivity_per_trend.csv`` and ``sensitivity.png`` to ``output_dir``.
+    Every method compares its own ``default`` trends with
+    ``extra_trend_sets``, which maps a name to comma separated trends.
+    """
+    summaries, per_trends = [], []
+    for method in methods:
+        default_text, _ = method_defaults(method)
+        trend_sets_text = {"default": default_text, **(extra_trend_sets or {})}
+        if method == "embedding":
+            cache_dir = EMBEDDING_CACHE_DIR / Path(filepath).stem
+            blocks, trends, trend_sets = embedding_blocks(
+                filepath, trend_sets_text, cache_dir, model
+            )
+        else:
+            blocks, trends, trend_sets = tfidf_blocks(filepath, trend_sets_text)
+        result = sweep_blocks(blocks, len(trends), thresholds, trend_sets)
+        summary, per_trend = sensitivity_tables(result, trends, trend_sets, method)
+        summaries.append(summary)
+        per_trends.append(per_trend)
+
+    summary = pd.concat(summaries, ignore_index=True)
+    per_trend = pd.concat(per_trends, ignore_index=True)
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    summary.to_csv(output_dir / "sensitivity.csv", index=False)
+    per_trend.to_csv(output_dir / "sensitivity_per_trend.csv", index=False)
+    plot_sensitivity(summary, output_dir / "sensitivity.png")
+    return summary, per_trend
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Coverage sensitivity to the threshold and trend list."
+    )
+    parser.add_argument(
+        "filepath", help="checkpoint CSV with the markdown and summary of every course"
+    )
+    parser.add_argument("--methods", nargs="+", choices=METHODS, default=METHODS)
+    parser.add_argument(
+        "--trend-set",
+        action="append",
+        default=[],
+        metavar="NAME=PATH",
+        help="extra comma separated trend list to compare, repeatable",
+    )
+    parser.add_argument("--start", type=float, default=0.0)
+    parser.add_argument("--stop", type=float, default=1.0)
+    parser.add_argument("--step", type=float, default=0.01)
+    parser.add_argument("--output-dir", type=Path, default=OUTPUT_DIR)
+    args = parser.parse_args(argv)
+
+    trend_sets = {}
+    for trend_set in args.trend_set:
+        name, _, path = trend_set.partition("=")
+        trend_sets[name] = Path(path).read_text(encoding="utf-8")
+
+    thresholds = np.arange(args.start, args.stop + args.step / 2, args.step)
+    summary, _ = run_sweep(
+        args.filepath, thresholds, args.methods, trend_sets, args.output_dir
+    )
+
+    # The rows for the thresholds the single-run reports use
+    defaults = {method: method_defaults(method)[1] for method in args.methods}
+    distance = (summary["threshold"] - summary["method"].map(defaults)).abs()
+    nearest = summary[distance == distance.groupby(summary["method"]).transform("min")]
+    print(nearest.drop(columns="uncovered_trends").to_string(index=False))
+    print(f"Saved the sensitivity table and plot to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+"""
+Incremental, out-of-core TF-IDF scoring.
+
+Instead of refitting a ``TfidfVectorizer`` on the whole catalog every run,
+the index keeps the raw term counts of every document on disk as sparse
+segments of ``segment_size`` rows, together with the vocabulary, the
+document frequencies and the last similarity of every document. ``update``
+only vectorizes new or changed documents, streaming them into new segments;
+the rows they replace are dropped from the document frequencies and
+compacted away once they outnumber the live ones.
+
+``score`` rescores only documents without a score, using the IDF snapshot
+of the last full fit. Once more than ``refit_fraction`` of the documents
+changed since then, or the trend text changed, the IDF is refreshed and all
+rows are rescored segment by segment. Right after a full fit the scores
+equal those of ``analysis.tfidf_similarity``.
+
+With ``hashing`` terms are hashed into ``n_features`` columns instead of
+being kept in a vocabulary, which bounds the memory of the index state no
+matter how many distinct terms the catalog has.
+"""
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from src.config import DATA_DIR
+from src.embeddings import text_key
+from src.scoring import iter_similarity_blocks
+
+INDEX_DIR = DATA_DIR / "tfidf_index"
+HASHING_FEATURES = 1 << 20
+
+
+class TfidfIndex:
+    def __init__(
+        self,
+        index_dir=INDEX_DIR,
+        hashing=False,
+        n_features=HASHING_FEATURES,
+        segment_size=10000,
+        refit_fraction=0.05,
+    ):
+        self.index_dir = Path(index_dir)
+        self.hashing = hashing
+        self.segment_size = segment_size
+        self.refit_fraction = refit_fraction
+        self._vectorizer = None
+        self._load(n_features)
+
+    def _path(self, name):
+        return self.index_dir / name
+
+    def _load(self, n_features):
+        self.state = {
+            "hashing": self.hashing,
+            "n_features": n_features if self.hashing else 0,
+            "segments": [],
+            "next_segment": 0,
+            "stored_rows": 0,
+            "changes_since_fit": 0,
+            "trends_key": None,
+            "n_rows": 0,
+        }
+        self.vocabulary = {}
+        self.df = np.zeros(self.n_features, dtype=np.int64)
+        self.idf = np.empty(0)
+        self.rows = pd.DataFrame(
+            {
+                "text_key": pd.Series(dtype=object),
+                "segment": pd.Series(dtype=np.int64),
+                "row": pd.Series(dtype=np.int64),
+                "similarity": pd.Series(dtype=np.float64),
+            }
+        )
+
+        if not self._path("state.json").exists():
+            return
+        with open(self._path("state.json"), "r", encoding="utf-8") as f:
+            state = json.load(f)
+        # A different mode or hashing width cannot reuse the stored counts
+        if state["hashing"] != self.hashing or (
+            self.hashing and state["n_features"] != n_features
+        ):
+            return
+
+        rows = pd.read_csv(self._path("rows.csv"), index_col="key", dtype={"key": str})
+        # A crash between writing the row table and the state leaves them out
+        # of sync, in which case the index is rebuilt from scratch
+        if len(rows) != state["n_rows"]:
+            return
+
+        self.state, self.rows = state, rows
+        if not self.hashing:
+            with open(self._path("vocabulary.json"), "r", encoding="utf-8") as f:
+                self.vocabulary = json.load(f)
+        self.df = np.load(self._path("df.npy"))
+        self.idf = np.load(self._path("idf.npy"))
+
+    def _replace(self, name, write, binary=False):
+        tmp = self._path(f"tmp_{name}")
+        with open(
+            tmp, "wb" if binary else "w", encoding=None if binary else "utf-8"
+        ) as f:
+            write(f)
+        os.replace(tmp, self._path(name))
+
+    def _save(self):
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        if not self.hashing:
+            self._replace("vocabulary.json", lambda f: json.dump(self.vocabulary, f))
+        self._replace("df.npy", lambda f: np.save(f, self.df), binary=True)
+        self._replace("idf.npy", lambda f: np.save(f, self.idf), binary=True)
+        self._replace("rows.csv", lambda f: self.rows.to_csv(f, index_label="key"))
+        self.state["n_rows"] = len(self.rows)
+        self._replace("state.json", lambda f: json.dump(self.state, f))
+
+    def _segment_name(self, segment):
+        return f"segment_{segment:06d}.npz"
+
+    def _read_segment(self, segment):
+        counts = sparse.load_npz(self._path(self._segment_name(segment))).tocsr()
+        # Older segments predate terms added to the vocabulary since
+        counts.resize(counts.shape[0], self.n_features)
+        return counts
+
+    def _write_segment(self, counts):
+        segment = self.state["next_segment"]
+        self.state["next_segment"] += 1
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        sparse.save_npz(self._path(self._segment_name(segment)), counts)
+        self.state["segments"].append(segment)
+        self.state["stored_rows"] += counts.shape[0]
+        return segment
+
+    @property
+    def n_features(self):
+        return self.state["n_features"] if self.hashing else len(self.vocabulary)
+
+    def _counts(self, texts):
+        """Raw term counts of ``texts``, adding new terms to the vocabulary."""
+        from sklearn.feature_extraction.text import CountVectorizer, HashingVectorizer
+
+        if self.hashing:
+            if self._vectorizer is None:
+                self._vectorizer = HashingVectorizer(
+                    n_features=self.n_features, alternate_sign=False, norm=None
+                )
+            return self._vectorizer.transform(texts).astype(np.float32).tocsr()
+
+        if self._vectorizer is None:
+            # The same tokenization as a default TfidfVectorizer
+            self._vectorizer = CountVectorizer().build_analyzer()
+        indptr, indices, values = [0], [], []
+        for text in texts:
+            counts = {}
+            for term in self._vectorizer(text):
+                column = self.vocabulary.setdefault(term, len(self.vocabulary))
+                counts[column] = counts.get(column, 0) + 1
+            indices.extend(counts)
+            values.extend(counts.values())
+            indptr.append(len(indices))
+        if len(self.df) < self.n_features:
+            self.df = np.pad(self.df, (0, self.n_features - len(self.df)))
+        return sparse.csr_matrix(
+            (np.asarray(values, dtype=np.float32), indices, indptr),
+            shape=(len(texts), self.n_features),
+        )
+
+    def _document_frequency(self, counts):
+        df = np.bincount(counts.indices, minlength=self.n_features)
+        return df.astype(np.int64)
+
+    def _iter_rows(self, rows):
+        """Yields ``(keys, counts)`` of ``rows`` one segment at a time."""
+        for segment, group in rows.groupby("segment", sort=True):
+            counts = self._read_segment(segment)
+            yield group.index, counts[group["row"].to_numpy()]
+
+    def update(self, keys, texts):
+        """
+        Brings the index in line with the documents ``texts`` keyed by
+        ``keys``: new and changed ones are vectorized, missing ones dropped.
+        Returns the keys that were (re)vectorized.
+        """
+        keys = pd.Index([str(key) for key in keys])
+        if not keys.is_unique:
+            raise ValueError("TF-IDF index keys must be unique")
+        texts = ["" if not isinstance(t, str) else t for t in texts]
+        new_keys = pd.Series([text_key(t) for t in texts], index=keys)
+
+        current = self.rows["text_key"].reindex(keys)
+        added = keys[current.isna().values | (current.values != new_keys.values)]
+        removed = self.rows.index.difference(keys).union(
+            added.intersection(self.rows.index)
+        )
+
+        for _, counts in self._iter_rows(self.rows.loc[removed]):
+            self.df -= self._document_frequency(counts)
+        self.rows = self.rows.drop(index=removed)
+
+        positions = keys.get_indexer(added)
+        new_rows = []
+        for start in range(0, len(added), self.segment_size):
+            chunk = positions[start : start + self.segment_size]
+            counts = self._counts([texts[i] for i in chunk])
+            self.df += self._document_frequency(counts)
+            segment = self._write_segment(counts)
+            new_rows.append(
+                pd.DataFrame(
+                    {
+                        "text_key": new_keys.values[chunk],
+                        "segment": segment,
+                        "row": np.arange(len(chunk)),
+                        "similarity": np.nan,
+                    },
+                    index=keys[chunk],
+                )
+            )
+        if new_rows:
+            self.rows = pd.concat([self.rows, *new_rows])
+        self.rows.index.name = "key"
+
+        self.state["changes_since_fit"] += len(added) + len(removed.difference(added))
+        # Replaced rows stay in their segments until they are the majority
+        if self.state["stored_rows"] > 2 * max(len(self.rows), self.segment_size):
+            self.compact()
+        else:
+            self._save()
+        return list(added)
+
+    def compact(self):
+        """Rewrites the segments with only the live rows."""
+        old_segments = list(self.state["segments"])
+        self.state["segments"] = []
+        self.state["stored_rows"] = 0
+        size = self.segment_size
+        pending, pending_keys, placed = [], [], []
+
+        def flush(counts, keys):
+            segment = self._write_segment(counts)
+            placed.append(
+                pd.DataFrame(
+                    {"segment": segment, "row": np.arange(len(keys))},
+                    index=pd.Index(keys, name="key"),
+                )
+            )
+
+        for keys, counts in self._iter_rows(self.rows):
+            pending.append(counts)
+            pending_keys.extend(keys)
+            while len(pending_keys) >= size:
+                merged = sparse.vstack(pending, format="csr")
+                flush(merged[:size], pending_keys[:size])
+                pending, pending_keys = [merged[size:]], pending_keys[size:]
+        if pending_keys:
+            flush(sparse.vstack(pending, format="csr"), pending_keys)
+
+        if placed:
+            placement = pd.concat(placed).loc[self.rows.index]
+            self.rows["segment"] = placement["segment"].values
+            self.rows["row"] = placement["row"].values
+        self._save()
+        for segment in old_segments:
+            self._path(self._segment_name(segment)).unlink(missing_ok=True)
+
+    def _current_idf(self, trend_counts):
+        # Smooth IDF as in TfidfVectorizer, over the documents and the trends
+        n = len(self.rows) + trend_counts.shape[0]
+        df = self.df + self._document_frequency(trend_counts)
+        return np.log((1 + n) / (1 + df)) + 1
+
+    def score(self, trends_text):
+        """
+        The best cosine similarity of every document to the trend text(s),
+        as a Series by key. ``trends_text`` is one text or a list of texts.
+        """
+        trends = [trends_text] if isinstance(trends_text, str) else list(trends_text)
+        trend_counts = self._counts(trends)
+        idf = self._current_idf(trend_counts)
+
+        trends_key = text_key("\n".join(trends))
+        n_docs = max(len(self.rows), 1)
+        if (
+            not len(self.idf)
+            or trends_key != self.state["trends_key"]
+            or self.state["changes_since_fit"] > self.refit_fraction * n_docs
+        ):
+            self.idf = idf
+            self.rows["similarity"] = np.nan
+            self.state["trends_key"] = trends_key
+            self.state["changes_since_fit"] = 0
+        elif len(self.idf) < len(idf):
+            # Terms new since the fit only occur in unscored documents
+            self.idf = np.concatenate([self.idf, idf[len(self.idf) :]])
+
+        weights = sparse.diags(self.idf.astype(np.float32))
+        trend_vectors = trend_counts @ weights
+        todo = self.rows[self.rows["similarity"].isna()]
+        for keys, counts in self._iter_rows(todo):
+            for start, block in iter_similarity_blocks(counts @ weights, trend_vectors):
+                self.rows.loc[keys[start : start + len(block)], "similarity"] = (
+                    block.max(axis=1)
+                )
+        self._save()
+        return self.rows["similarity"]
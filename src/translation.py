@@ -0,0 +1,122 @@
+"""
+Batched, cached translation of course texts.
+
+Texts are deduplicated, looked up in a persistent cache keyed by source
+language, target language and text hash, and only the misses are sent to the
+backend in size-limited batches from a small thread pool. Re-running on
+unchanged rows therefore makes no translation calls at all. Whether a batch
+costs one call or one per text is up to the backend; the Google backend
+translates text by text, so there batches only spread the work over the
+workers.
+"""
+
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from src.checkpoint import CheckpointJournal
+from src.config import DATA_DIR
+
+TRANSLATION_CACHE_PATH = DATA_DIR / "translations.jsonl"
+
+
+class GoogleBackend:
+    """
+    deep-translator's Google backend. A ``GoogleTranslator`` keeps the
+    parameters of the request in flight on the instance, so every worker
+    thread gets a translator of its own.
+    """
+
+    def __init__(self, source, target):
+        from deep_translator import GoogleTranslator
+
+        self._factory = lambda: GoogleTranslator(source=source, target=target)
+        self._local = threading.local()
+
+    def translate_batch(self, texts):
+        if not hasattr(self._local, "translator"):
+            self._local.translator = self._factory()
+        return self._local.translator.translate_batch(texts)
+
+
+class FakeBackend:
+    """Offline backend for tests, tags every text and counts the calls."""
+
+    def __init__(self, source, target):
+        self.target = target
+        self.calls = []
+
+    def translate_batch(self, texts):
+        self.calls.append(list(texts))
+        return [f"[{self.target}] {text}" for text in texts]
+
+
+BACKENDS = {"google": GoogleBackend, "fake": FakeBackend}
+
+
+def translation_key(source, target, text):
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return f"{source}:{target}:{digest}"
+
+
+def batches(texts, max_chars=4500, max_items=50):
+    """Groups texts so each batch stays below the backend's request limits."""
+    batch, size = [], 0
+    for text in texts:
+        if batch and (size + len(text) > max_chars or len(batch) == max_items):
+            yield batch
+            batch, size = [], 0
+        batch.append(text)
+        size += len(text)
+    if batch:
+        yield batch
+
+
+class Translator:
+    def __init__(
+        self,
+        source="nl",
+        target="en",
+        backend="google",
+        cache_path=TRANSLATION_CACHE_PATH,
+        workers=4,
+        max_chars=4500,
+    ):
+        self.source = source
+        self.target = target
+        if isinstance(backend, str):
+            backend = BACKENDS[backend](source, target)
+        self.backend = backend
+        self.cache = CheckpointJournal(cache_path, key="key")
+        self.workers = workers
+        self.max_chars = max_chars
+
+    def translate(self, texts):
+        """
+        Translates ``texts``, returning ``""`` for missing or empty ones.
+        """
+        texts = [t if isinstance(t, str) else "" for t in texts]
+        keys = [translation_key(self.source, self.target, t) for t in texts]
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if text.strip() and key not in self.cache and key not in missing:
+                missing[key] = text
+
+        if missing:
+            keys_missing = list(missing)
+            text_batches = list(batches(missing.values(), self.max_chars))
+            offset = 0
+            with self.cache, ThreadPoolExecutor(max_workers=self.workers) as executor:
+                # Batches come back in order, each one is cached as it arrives
+                for translated in executor.map(
+                    self.backend.translate_batch, text_batches
+                ):
+                    batch_keys = keys_missing[offset : offset + len(translated)]
+                    for key, translation in zip(batch_keys, translated):
+                        self.cache.append({"key": key, "text": translation or ""})
+                    offset += len(translated)
+
+        return [
+            self.cache.get(key)["text"] if key in self.cache else "" for key in keys
+        ]
@@ -1,74 +1,231 @@
 from bs4 import BeautifulSoup
 import pandas as pd
-from crawl4ai import AsyncWebCrawler, CrawlerRunConfig
 import asyncio
+import json
+import requests
+import time
+from contextlib import AsyncExitStack
 from tqdm import tqdm
+from tqdm.asyncio import tqdm_asyncio
+from src.crawl_cache import CrawlCache, check_page
+from src.listing import extract_links
 from src.config import DOMAIN_URL, DATA_DIR
+from src.metrics import METRICS
 from pathlib import Path
 
 
 class HTMLScrapper:
+    """
+    Extracts ``name`` and ``url`` from saved listing pages. By default the
+    pages are streamed through ``src.listing`` without building a DOM;
+    ``streaming=False`` parses them with BeautifulSoup instead. A list of
+    paths (e.g. a paginated dump) is parsed in parallel and concatenated in
+    order.
+    """
+
+    @staticmethod
+    def _paths(file_path):
+        if isinstance(file_path, (str, Path)):
+            return [file_path]
+        return list(file_path)
+
     @staticmethod
-    def scrape_minors(file_path):
-        with open(file_path, "r", encoding="utf-8") as f:
-            html = f.read()
+    def scrape_minors(file_path, streaming=True, workers=None):
+        paths = HTMLScrapper._paths(file_path)
+        if streaming:
+            links = extract_links(paths, "minors", workers)
+            return pd.DataFrame(
+                [{"name": name, "url": DOMAIN_URL + url} for name, url in links]
+            )
 
-        soup = BeautifulSoup(html, "html.parser")
         result = []
+        for path in paths:
+            with open(path, "r", encoding="utf-8") as f:
+                html = f.read()
+
+            soup = BeautifulSoup(html, "html.parser")
 
-        for h4 in soup.find_all("h4"):
-            a_tag = h4.find("a")
-            if a_tag and a_tag.has_attr("href"):
-                url = a_tag["href"]
-                name = a_tag.get_text(strip=True)
-                result.append({"name": name, "url": DOMAIN_URL + url})
+            for h4 in soup.find_all("h4"):
+                a_tag = h4.find("a")
+                if a_tag and a_tag.has_attr("href"):
+                    url = a_tag["href"]
+                    name = a_tag.get_text(strip=True)
+                    result.append({"name": name, "url": DOMAIN_URL + url})
 
         return pd.DataFrame(result)
 
     @staticmethod
-    def scrape_courses(file_name):
+    def scrape_courses(file_name, streaming=True, workers=None):
         """
         Extracts all <a class="finder-result__title"> tags from an HTML file
         and returns a DataFrame with 'name' and full 'url'.
         """
-        file_path = Path.joinpath(DATA_DIR, file_name)
-        with open(file_path, "r", encoding="utf-8") as f:
-            html = f.read()
+        paths = [Path.joinpath(DATA_DIR, p) for p in HTMLScrapper._paths(file_name)]
+        if streaming:
+            links = extract_links(paths, "courses", workers)
+            return pd.DataFrame(
+                [{"name": name, "url": DOMAIN_URL + url} for name, url in links]
+            )
 
-        soup = BeautifulSoup(html, "html.parser")
         results = []
+        for file_path in paths:
+            with open(file_path, "r", encoding="utf-8") as f:
+                html = f.read()
 
-        for a in soup.find_all("a", class_="finder-result__title"):
-            name = a.get_text(strip=True)
-            relative_url = a.get("href", "")
-            full_url = DOMAIN_URL + relative_url
-            results.append({"name": name, "url": full_url})
+            soup = BeautifulSoup(html, "html.parser")
+
+            for a in soup.find_all("a", class_="finder-result__title"):
+                name = a.get_text(strip=True)
+                relative_url = a.get("href", "")
+                full_url = DOMAIN_URL + relative_url
+                results.append({"name": name, "url": full_url})
 
         return pd.DataFrame(results)
 
 
-async def crawl_url(url, semaphore):
+class CrawlerPool:
+    """
+    Launches ``size`` browsers once and shares them across all URLs.
+
+    Use as ``async with CrawlerPool(5) as pool`` and iterate
+    ``pool.stream(urls)`` to get ``(url, markdown)`` pairs in completion
+    order. A URL that fails or exceeds ``timeout`` seconds yields ``None``
+    instead of cancelling the run.
+    """
+
+    def __init__(self, size=5, timeout=60):
+        # Only rendering needs the browser stack, parsing listings does not
+        from crawl4ai import CrawlerRunConfig
 
-    async with semaphore:
-        run_config = CrawlerRunConfig(cache_mode="BYPASS")
-        async with AsyncWebCrawler() as crawler:
-            result = await crawler.arun(url=url, config=run_config)
+        self.size = size
+        self.timeout = timeout
+        self.run_config = CrawlerRunConfig(cache_mode="BYPASS")
+        self._idle = asyncio.Queue()
+        self._stack = None
+
+    async def __aenter__(self):
+        from crawl4ai import AsyncWebCrawler
+
+        self._stack = AsyncExitStack()
+        for _ in range(self.size):
+            crawler = await self._stack.enter_async_context(AsyncWebCrawler())
+            self._idle.put_nowait(crawler)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._stack.aclose()
+
+    async def crawl(self, url):
+        crawler = await self._idle.get()
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await asyncio.wait_for(
+                crawler.arun(url=url, config=self.run_config), self.timeout
+            )
+            if not result.success:
+                raise RuntimeError(result.error_message)
+            outcome = "ok"
+            METRICS.observe("crawl_markdown_bytes", len(result.markdown or ""))
             return result.markdown
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            raise
+        finally:
+            self._idle.put_nowait(crawler)
+            METRICS.observe(
+                "crawl_page_seconds", time.perf_counter() - start, outcome=outcome
+            )
+            METRICS.count("crawl_pages_total", outcome=outcome)
 
+    async def _crawl_safe(self, url):
+        try:
+            return url, await self.crawl(url)
+        except asyncio.TimeoutError:
+            print(f"Timeout crawling {url}")
+        except Exception as e:
+            print(f"Error crawling {url}: {e}")
+        return url, None
+
+    async def stream(self, urls):
+        tasks = [asyncio.create_task(self._crawl_safe(url)) for url in urls]
+        try:
+            for coro in asyncio.as_completed(tasks):
+                yield await coro
+        finally:
+            for task in tasks:
+                task.cancel()
 
-async def crawl_all_urls(urls, thread_num=30):
-    semaphore = asyncio.Semaphore(thread_num)
 
-    tasks = [crawl_url(url, semaphore) for url in urls]
-    results = []
+async def crawl_cached(urls, cache_path, pool_size=5, timeout=60):
+    """
+    Crawls ``urls`` through the crawl cache at ``cache_path``.
 
-    for coro in tqdm(
-        asyncio.as_completed(tasks), total=len(tasks), desc="Crawling URLs"
-    ):
-        result = await coro
-        results.append(result)
+    Cached pages are first revalidated with conditional requests; only new
+    or changed pages are rendered by the browser pool. Returns the cache and
+    a report listing the ``new`` (not cached before), ``changed``,
+    ``unchanged`` and ``failed`` URLs.
+    """
+    unique_urls = list(dict.fromkeys(urls))
+    report = {"new": [], "changed": [], "unchanged": [], "failed": []}
 
-    return results
+    span = METRICS.span("crawl_cached")
+    with span, CrawlCache(cache_path) as cache, requests.Session() as session:
+
+        async def check(url):
+            try:
+                return await asyncio.to_thread(
+                    check_page, session, url, cache.get(url), timeout
+                )
+            except Exception as e:
+                print(f"Conditional request failed for {url}: {e}")
+                return True, {}
+
+        checks = await tqdm_asyncio.gather(
+            *(check(url) for url in unique_urls), desc="Checking URLs"
+        )
+
+        to_render = {}
+        for url, (changed, validators) in zip(unique_urls, checks):
+            if changed:
+                to_render[url] = validators
+            else:
+                cache.refresh(url, validators)
+                report["unchanged"].append(url)
+
+        if to_render:
+            async with CrawlerPool(pool_size, timeout) as pool:
+                with tqdm(total=len(to_render), desc="Crawling URLs") as pbar:
+                    async for url, markdown in pool.stream(to_render):
+                        if markdown is None:
+                            report["failed"].append(url)
+                        else:
+                            outcome = "changed" if url in cache else "new"
+                            cache.store(url, to_render[url], markdown)
+                            report[outcome].append(url)
+                        pbar.update()
+
+        if cache.superseded > len(cache):
+            cache.compact()
+
+    for outcome, outcome_urls in report.items():
+        METRICS.count("crawl_urls_total", len(outcome_urls), outcome=outcome)
+
+    return cache, report
+
+
+async def crawl_all_urls(urls, thread_num=30):
+    """Returns the markdown of ``urls`` in input order, ``None`` for failures."""
+    unique_urls = list(dict.fromkeys(urls))
+    results = {}
+    with METRICS.span("crawl_all_urls"):
+        async with CrawlerPool(thread_num) as pool:
+            with tqdm(total=len(unique_urls), desc="Crawling URLs") as pbar:
+                async for url, markdown in pool.stream(unique_urls):
+                    results[url] = markdown
+                    pbar.update()
+
+    return [results.get(url) for url in urls]
 
 
 def main():
@@ -78,13 +235,24 @@ def main():
 
     print(f"Crawling {len(df)} URLs")
 
-    markdown_results = asyncio.run(crawl_all_urls(urls, thread_num=25))
-    df["markdown"] = markdown_results
+    cache, report = asyncio.run(
+        crawl_cached(urls, Path.joinpath(DATA_DIR, "course_descriptions.jsonl"), 25)
+    )
+    df["markdown"] = cache.lookup(df["url"], "markdown").values
+
+    print(
+        f"{len(report['new'])} new, {len(report['changed'])} changed, "
+        f"{len(report['unchanged'])} unchanged, "
+        f"{len(report['failed'])} failed"
+    )
+    with open(Path.joinpath(DATA_DIR, "crawl_report.json"), "w") as f:
+        json.dump(report, f, indent=2)
 
     # Preview and optionally save
     print(df[["name", "url", "markdown"]].head())
     df.to_csv(Path.joinpath(DATA_DIR, "course_descriptions.csv"), index=False)
     print("Saved results to courses_descriptions.csv")
+    METRICS.export("webscraper")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,116 @@
+import asyncio
+import hashlib
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+import requests
+
+from benchmarks.llm_server import BackgroundServer
+from src import webscraper
+from src.crawl_cache import CrawlCache, check_page
+
+
+def fixture_handler(pages, etags=True):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            body = pages[self.path].encode("utf-8")
+            etag = '"' + hashlib.md5(body).hexdigest() + '"'
+            if etags and self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            if etags:
+                self.send_header("ETag", etag)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+@pytest.fixture
+def site():
+    pages = {f"/course/{i}": f"<h1>Course {i}</h1>" for i in range(3)}
+    with BackgroundServer(fixture_handler(pages)) as server:
+        yield server.url.rstrip("/"), pages
+
+
+class FakePool:
+    """Stands in for the browser pool, "rendering" a page by fetching it."""
+
+    rendered = []
+
+    def __init__(self, size=5, timeout=60):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    async def stream(self, urls):
+        for url in urls:
+            FakePool.rendered.append(url)
+            yield url, requests.get(url, timeout=5).text
+
+
+def test_check_page_revalidates_with_etag(site):
+    base, pages = site
+    url = f"{base}/course/0"
+    with requests.Session() as session:
+        changed, validators = check_page(session, url)
+        assert changed and validators["etag"]
+
+        record = {"url": url, **validators, "markdown": "# Course 0"}
+        assert check_page(session, url, record) == (False, validators)
+
+        pages["/course/0"] = "<h1>Course 0, new edition</h1>"
+        changed, new_validators = check_page(session, url, record)
+        assert changed and new_validators["etag"] != validators["etag"]
+
+
+def test_check_page_falls_back_to_content_hash():
+    pages = {"/course/0": "<h1>Course 0</h1>"}
+    with BackgroundServer(fixture_handler(pages, etags=False)) as server:
+        url = server.url.rstrip("/") + "/course/0"
+        with requests.Session() as session:
+            _, validators = check_page(session, url)
+            record = {"url": url, **validators, "markdown": "# Course 0"}
+            assert check_page(session, url, record)[0] is False
+
+            pages["/course/0"] = "<h1>Course 0, new edition</h1>"
+            assert check_page(session, url, record)[0] is True
+
+
+def test_crawl_cached_only_renders_changed_pages(site, tmp_path, monkeypatch):
+    base, pages = site
+    monkeypatch.setattr(webscraper, "CrawlerPool", FakePool)
+    FakePool.rendered = []
+    urls = [f"{base}{path}" for path in pages]
+    cache_path = tmp_path / "crawl.jsonl"
+
+    _, report = asyncio.run(webscraper.crawl_cached(urls, cache_path))
+    assert sorted(report["new"]) == sorted(urls) and not report["changed"]
+    assert len(FakePool.rendered) == 3
+
+    FakePool.rendered = []
+    _, report = asyncio.run(webscraper.crawl_cached(urls, cache_path))
+    assert sorted(report["unchanged"]) == sorted(urls)
+    assert FakePool.rendered == []
+
+    pages["/course/1"] = "<h1>Course 1, new edition</h1>"
+    cache, report = asyncio.run(webscraper.crawl_cached(urls, cache_path))
+    assert report["changed"] == [urls[1]] == FakePool.rendered
+    assert "new edition" in cache.get(urls[1])["markdown"]
+
+    assert len(CrawlCache(cache_path)) == 3
@@ -0,0 +1,30 @@
+import numpy as np
+
+from src.dedup import candidate_probability, find_near_duplicates, lsh_bands
+
+
+def words(start, stop):
+    return " ".join(f"w{i}" for i in range(start, stop))
+
+
+def test_groups_identical_pages_and_leaves_unique_ones():
+    texts = [words(0, 40), "something else entirely", words(0, 40), None, ""]
+    representatives, similarity = find_near_duplicates(texts, 0.9, shingle_size=1)
+    assert representatives.tolist() == [0, 1, 0, 3, 4]
+    assert similarity.tolist() == [1.0, 1.0, 1.0, 0.0, 0.0]
+
+
+def test_members_are_above_threshold_against_their_representative():
+    # Each page is close to the next, but the third is not close to the first
+    texts = [words(0, 30), words(3, 33), words(6, 36)]
+    representatives, similarity = find_near_duplicates(texts, 0.75, shingle_size=1)
+    assert representatives.tolist() == [0, 0, 2]
+    assert np.allclose(similarity, [1.0, 27 / 33, 1.0])
+
+
+def test_lsh_bands_favour_recall_at_the_threshold():
+    for threshold in (0.5, 0.8, 0.9, 0.95):
+        bands, rows = lsh_bands(threshold, 128)
+        assert bands * rows <= 128
+        assert candidate_probability(threshold, bands, rows) >= 0.99
+    assert lsh_bands(0.9, 128) == (12, 10)
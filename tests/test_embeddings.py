@@ -0,0 +1,36 @@
+import numpy as np
+
+from src.embeddings import EmbeddingCache
+
+
+class CountingEncoder:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return np.array([[len(t), 1.0] for t in texts], dtype=np.float32)
+
+
+def test_cache_only_encodes_missing_texts(tmp_path):
+    encode = CountingEncoder()
+    cache = EmbeddingCache(tmp_path, "model")
+    cache.encode(["a", "bb"], encode)
+    vectors = EmbeddingCache(tmp_path, "model").encode(["bb", "ccc"], encode)
+    assert encode.calls == [["a", "bb"], ["ccc"]]
+    assert vectors[:, 0].tolist() == [2, 3]
+
+
+def test_cache_without_eviction_is_capped(tmp_path):
+    encode = CountingEncoder()
+    cache = EmbeddingCache(tmp_path, "model")
+    for text in ["a", "bb", "ccc"]:
+        cache.encode([text], encode, evict=False, max_entries=2)
+    assert len(cache) == 2
+
+    # "bb" was used last, so "ccc" goes when "dddd" comes in
+    cache.encode(["bb", "dddd"], encode, evict=False, max_entries=2)
+    encode.calls = []
+    cache = EmbeddingCache(tmp_path, "model")
+    cache.encode(["bb", "dddd"], encode, evict=False, max_entries=2)
+    assert encode.calls == [] and len(cache) == 2
@@ -0,0 +1,30 @@
+import pandas as pd
+
+from src.fuzzy_join import fuzzy_join
+
+
+def test_matches_names_that_differ_in_spelling():
+    left = pd.DataFrame({"name": ["Data Science in de praktijk", "Zakelijk  Duits"]})
+    right = pd.DataFrame(
+        {"Naam opleiding": ["Zakelijk Duits", "Data Science in de praktijk!!"]}
+    )
+    joined = fuzzy_join(left, right, "name", "Naam opleiding")
+    assert joined["Naam opleiding"].tolist() == right["Naam opleiding"][::-1].tolist()
+    assert (joined["_merge"] == "both").all()
+
+
+def test_never_matches_names_with_different_numbers():
+    left = pd.DataFrame(
+        {
+            "name": [
+                "ISAK level 2 – Meten van lichaamssamenstelling (najaar)",
+                "ISAK level 1 – Meten van lichaamssamenstelling (najaar)",
+            ]
+        }
+    )
+    right = pd.DataFrame(
+        {"Naam opleiding": ["ISAK level 1 – Meten van lichaamssamenstelling"]}
+    )
+    joined = fuzzy_join(left, right, "name", "Naam opleiding")
+    assert joined["_merge"].tolist() == ["left_only", "both"]
+    assert joined["Naam opleiding"][1] == right["Naam opleiding"][0]
@@ -0,0 +1,48 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Only pandas is paid for at import time, these load inside the functions
+HEAVY = [
+    "torch",
+    "sentence_transformers",
+    "transformers",
+    "sklearn",
+    "scipy",
+    "matplotlib",
+    "fpdf",
+    "deep_translator",
+]
+
+# Generous against the ~0.5 s pandas takes, it only catches a heavy import
+# creeping back in at module level
+IMPORT_BUDGET_SECONDS = 3.0
+
+SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+print(json.dumps({{
+    "seconds": time.perf_counter() - start,
+    "modules": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+
+@pytest.mark.parametrize("module", ["analysis", "src.analysis"])
+def test_import_stays_light(module):
+    result = subprocess.run(
+        [sys.executable, "-c", SCRIPT.format(module=module, heavy=HEAVY)],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    assert report["modules"] == []
+    assert report["seconds"] < IMPORT_BUDGET_SECONDS
@@ -0,0 +1,227 @@
+import json
+
+import pandas as pd
+import pytest
+
+from benchmarks.llm_server import BackgroundServer, make_handler
+from src import llm
+
+
+@pytest.fixture
+def llm_server():
+    base = make_handler(latency=0)
+
+    class Handler(base):
+        requests = []
+
+        def do_POST(self):
+            Handler.requests.append(self.path)
+            super().do_POST()
+
+    with BackgroundServer(Handler) as server:
+        server.requests = Handler.requests
+        yield server
+
+
+def pages(markdown):
+    return pd.DataFrame(
+        {
+            "url": [f"https://han.nl/{i}" for i in range(len(markdown))],
+            "name": [f"Course {i}" for i in range(len(markdown))],
+            "markdown": markdown,
+        }
+    )
+
+
+def test_summarize_only_redoes_pages_whose_markdown_changed(llm_server, tmp_path):
+    checkpoint = tmp_path / "summaries.jsonl"
+    result = tmp_path / "summaries.csv"
+    df = pages(["Robotics", "Ethics", "Privacy"])
+
+    llm.summarize_minors(df, checkpoint, result, url=llm_server.url)
+    assert len(llm_server.requests) == 3
+
+    # Listed as changed by the crawl, but the markdown is the same
+    urls = df["url"].tolist()
+    llm.summarize_minors(df, checkpoint, result, url=llm_server.url, changed_urls=urls)
+    assert len(llm_server.requests) == 3
+
+    df.loc[1, "markdown"] = "Ethics and bias"
+    llm.summarize_minors(df, checkpoint, result, url=llm_server.url)
+    assert len(llm_server.requests) == 4
+    assert "Ethics and bias" in pd.read_csv(result)["summary"][1]
+
+
+def test_summarize_redoes_imported_records_only_when_changed(llm_server, tmp_path):
+    checkpoint = tmp_path / "summaries.jsonl"
+    df = pages(["Robotics", "Ethics"])
+    with open(checkpoint, "w", encoding="utf-8") as f:
+        for url in df["url"]:
+            f.write(json.dumps({"url": url, "summary": "Imported"}) + "\n")
+
+    llm.summarize_minors(
+        df,
+        checkpoint,
+        tmp_path / "summaries.csv",
+        url=llm_server.url,
+        changed_urls=[df["url"][0]],
+    )
+    assert len(llm_server.requests) == 1
+
+
+def test_parse_packed_response_by_id():
+    text = 'Sure!\n```json\n{"2": "Second.", " 1 ": "First.", "9": "Extra."}\n```'
+    assert llm.parse_packed_response(text, [1, 2]) == {1: "First.", 2: "Second."}
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "Here are the summaries: first, second.",
+        '["First.", "Second."]',
+        '{"1": "First.", "2": ',
+        '{"1, 2": "Both courses teach robotics."}',
+        '{"1": "", "2": null}',
+    ],
+)
+def test_parse_packed_response_drops_malformed_entries(text):
+    assert llm.parse_packed_response(text, [1, 2]) == {}
+
+
+def packed_reply_handler(packed_reply):
+    """Answers packed requests with ``packed_reply``, single ones correctly."""
+    from http.server import BaseHTTPRequestHandler
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        bodies = []
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            user = body["messages"][-1]["content"]
+            Handler.bodies.append(user)
+            content = packed_reply if "### Course" in user else f"About {user}"
+            payload = json.dumps(
+                {"choices": [{"message": {"content": content}}]}
+            ).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    return Handler
+
+
+@pytest.mark.parametrize(
+    "packed_reply, retried",
+    [
+        ('{"1": "About Robotics", "2": "About Ethics", "3": "About Privacy"}', []),
+        ('{"3": "About Privacy", "1": "About Robotics"}', ["Ethics"]),
+        ('{"1, 2, 3": "About all three"}', ["Robotics", "Ethics", "Privacy"]),
+        ("I cannot help with that.", ["Robotics", "Ethics", "Privacy"]),
+    ],
+)
+def test_summarize_pack_retries_what_the_packed_answer_misses(packed_reply, retried):
+    handler = packed_reply_handler(packed_reply)
+    pack = [(1, "Robotics"), (2, "Ethics"), (3, "Privacy")]
+    with BackgroundServer(handler) as server:
+        summaries = llm.summarize_pack(pack, url=server.url)
+
+    assert summaries == {i: f"About {markdown}" for i, markdown in pack}
+    assert handler.bodies[1:] == retried
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(round(seconds, 6))
+        self.now += seconds
+
+
+def test_rate_limiter_increases_and_decreases_additively():
+    limiter = llm.RateLimiter(step=0.1, recovery=0.5, max_interval=0.25)
+    for expected in (0.1, 0.2, 0.25, 0.25):
+        limiter.throttle()
+        assert limiter.interval == pytest.approx(expected)
+    for expected in (0.2, 0.15, 0.1, 0.05, 0.0, 0.0):
+        limiter.success()
+        assert limiter.interval == pytest.approx(expected)
+
+
+def test_rate_limiter_stays_low_under_sporadic_429s():
+    limiter = llm.RateLimiter()
+    for _ in range(100):
+        limiter.throttle()
+        for _ in range(3):
+            limiter.success()
+    assert limiter.interval == pytest.approx(0.0)
+
+
+def test_rate_limiter_spaces_requests_and_honours_retry_after(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(llm, "time", clock)
+    limiter = llm.RateLimiter(step=0.5)
+    limiter.throttle()
+    for _ in range(3):
+        limiter.wait()
+    assert clock.sleeps == [0.5, 0.5]
+
+    # Retry-After holds back the next start without widening the interval
+    limiter.throttle(retry_after=2.0)
+    limiter.wait()
+    assert clock.sleeps[-1] == pytest.approx(2.0) and limiter.interval == 0.5
+
+
+def status_handler(statuses):
+    """Answers with the next of ``statuses`` (code, headers), then 200."""
+    from http.server import BaseHTTPRequestHandler
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            status, headers = statuses.pop(0) if statuses else (200, {})
+            payload = json.dumps(
+                {"choices": [{"message": {"content": "Summary"}}]}
+            ).encode("utf-8")
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    return Handler
+
+
+def test_post_chat_retries_429s_through_the_rate_limiter():
+    statuses = [(429, {}), (429, {"Retry-After": "0"}), (503, {})]
+    limiter = llm.RateLimiter(step=0.01, recovery=0.5)
+    with BackgroundServer(status_handler(statuses)) as server:
+        answer = llm.chat_with_model(
+            "Robotics", url=server.url, backoff=0, rate_limiter=limiter
+        )
+    assert answer == "Summary" and statuses == []
+    # One 429 without Retry-After widened it, the success narrowed it again
+    assert limiter.interval == pytest.approx(0.005)
+
+
+def test_post_chat_gives_up_after_max_retries():
+    statuses = [(429, {"Retry-After": "0"})] * 3
+    with BackgroundServer(status_handler(statuses)) as server:
+        with pytest.raises(llm.RetryableError):
+            llm.chat_with_model("Robotics", url=server.url, backoff=0, max_retries=2)
+    assert statuses == []
@@ -0,0 +1,24 @@
+from src.metrics import Metrics
+
+
+def test_prometheus_text_escapes_label_values():
+    metrics = Metrics()
+    metrics.count("llm_retries_total", reason='HTTP "429"\nC:\\retry')
+    lines = metrics.prometheus_text(prefix="").splitlines()
+    assert lines == [
+        "# TYPE llm_retries_total counter",
+        'llm_retries_total{reason="HTTP \\"429\\"\\nC:\\\\retry"} 1',
+    ]
+
+
+def test_span_records_time_and_status():
+    metrics = Metrics()
+    try:
+        with metrics.span("stage", stage="crawl"):
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    report = metrics.report()
+    assert report["spans"][0]["status"] == "error"
+    assert report["histograms"][0]["name"] == "stage_seconds"
+    assert report["histograms"][0]["value"]["count"] == 1
@@ -0,0 +1,25 @@
+from src.pipeline import Pipeline, Stage, build_stages
+
+
+def test_options_are_not_part_of_the_fingerprint(tmp_path):
+    source = tmp_path / "in.txt"
+    source.write_text("data")
+
+    def stage(options=None, **params):
+        return Stage("copy", None, [source], [], params, options)
+
+    base = stage(threshold=0.9).fingerprint()
+    assert stage({"workers": 16}, threshold=0.9).fingerprint() == base
+    assert stage(threshold=0.8).fingerprint() != base
+
+
+def test_pool_sizes_are_options():
+    pipeline = Pipeline(build_stages("ethics, bias", 0.3))
+    assert "workers" not in pipeline.stages["summarize_minors"].params
+    assert "pool_size" not in pipeline.stages["crawl_minors"].params
+
+
+def test_courses_are_scored_from_the_merged_table():
+    pipeline = Pipeline(build_stages("ethics, bias", 0.3, "courses"))
+    assert pipeline.deps["score"] == {"merge_courses"}
+    assert pipeline.deps["merge_courses"] == {"summarize_courses"}
@@ -0,0 +1,100 @@
+import asyncio
+import json
+
+import numpy as np
+
+from src import service
+
+
+class FakeModel:
+    """Embeds a text by its letter counts, fails on texts containing "boom"."""
+
+    def encode(self, texts, **kwargs):
+        if any("boom" in t for t in texts):
+            raise RuntimeError("cannot encode")
+        vectors = np.zeros((len(texts), 26), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for c in text:
+                if "a" <= c <= "z":
+                    vectors[i, ord(c) - ord("a")] += 1
+        return vectors + 1e-3
+
+
+async def request(port, method, path, body=b""):
+    return await raw_request(
+        port,
+        f"{method} {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\n"
+        f"Connection: close\r\n\r\n".encode("latin-1") + body,
+    )
+
+
+async def raw_request(port, data):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(data)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    payload = json.loads(await reader.readexactly(length))
+    writer.close()
+    return status, payload
+
+
+def score(port, text):
+    return request(port, "POST", "/score", json.dumps({"text": text}).encode())
+
+
+async def run_service(check, monkeypatch):
+    monkeypatch.setattr(service, "get_model", lambda model: FakeModel())
+    scorer = service.Scorer("ethics, robotics", 0.99, max_wait_ms=50)
+    batcher = asyncio.create_task(scorer.run_batcher())
+    server = await asyncio.start_server(
+        lambda r, w: service.handle(scorer, r, w), "127.0.0.1", 0
+    )
+    try:
+        await check(server.sockets[0].getsockname()[1])
+    finally:
+        server.close()
+        batcher.cancel()
+
+
+def test_rejects_texts_that_are_not_strings(monkeypatch):
+    async def check(port):
+        for body in [b"{}", b"not json", b'{"text": 42}', b'{"text": " "}']:
+            status, payload = await request(port, "POST", "/score", body)
+            assert status == 400 and "error" in payload
+        assert (await request(port, "GET", "/stats"))[1]["requests"] == 0
+
+    asyncio.run(run_service(check, monkeypatch))
+
+
+def test_scoring_failure_only_fails_its_own_request(monkeypatch):
+    async def check(port):
+        responses = await asyncio.gather(
+            score(port, "robotics"), score(port, "boom"), score(port, "ethics")
+        )
+        assert [status for status, _ in responses] == [200, 500, 200]
+        assert responses[0][1]["covered_trends"] == ["robotics"]
+        assert responses[2][1]["covered_trends"] == ["ethics"]
+
+        _, stats = await request(port, "GET", "/stats")
+        assert stats["requests"] == 3 and stats["errors"] == 1
+
+    asyncio.run(run_service(check, monkeypatch))
+
+
+def test_answers_malformed_requests_with_400(monkeypatch):
+    async def check(port):
+        for data in [
+            b"GARBAGE\r\n\r\n",
+            b"POST /score HTTP/1.1\r\nContent-Length: ten\r\n\r\n",
+            b"POST /score HTTP/1.1\r\nContent-Length: -1\r\n\r\n",
+        ]:
+            status, payload = await raw_request(port, data)
+            assert status == 400 and payload["error"] == "malformed request"
+        assert (await score(port, "ethics"))[0] == 200
+
+    asyncio.run(run_service(check, monkeypatch))
@@ -0,0 +1,88 @@
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+from src.translation import FakeBackend, GoogleBackend, Translator, batches
+
+
+class RacyGoogleTranslator:
+    """Keeps the text in flight on the instance, like deep-translator does."""
+
+    instances = []
+
+    def __init__(self, source, target):
+        self.target = target
+        self._url_params = {}
+        RacyGoogleTranslator.instances.append(self)
+
+    def translate(self, text):
+        self._url_params["q"] = text
+        time.sleep(0.001)
+        return f"[{self.target}] {self._url_params['q']}"
+
+    def translate_batch(self, texts):
+        return [self.translate(text) for text in texts]
+
+
+@pytest.fixture
+def google(monkeypatch):
+    module = types.ModuleType("deep_translator")
+    module.GoogleTranslator = RacyGoogleTranslator
+    monkeypatch.setitem(sys.modules, "deep_translator", module)
+    RacyGoogleTranslator.instances = []
+    return GoogleBackend("nl", "en")
+
+
+def test_batches_respect_chars_and_items():
+    texts = ["a" * 40, "b" * 40, "c" * 40, "d", "e", "f"]
+    assert [len(b) for b in batches(texts, max_chars=100, max_items=3)] == [2, 3, 1]
+    assert list(batches(["x" * 200], max_chars=100)) == [["x" * 200]]
+
+
+def test_translate_caches_and_skips_empty_texts(tmp_path):
+    backend = FakeBackend("nl", "en")
+    cache_path = tmp_path / "translations.jsonl"
+    texts = ["Kunstmatige intelligentie", None, "", "Data", "Data"]
+
+    translator = Translator(backend=backend, cache_path=cache_path)
+    expected = ["[en] Kunstmatige intelligentie", "", "", "[en] Data", "[en] Data"]
+    assert translator.translate(texts) == expected
+    assert sorted(sum(backend.calls, [])) == ["Data", "Kunstmatige intelligentie"]
+
+    backend.calls = []
+    translator = Translator(backend=backend, cache_path=cache_path)
+    assert translator.translate(texts) == expected
+    assert backend.calls == []
+
+
+def test_translate_batches_the_misses(tmp_path):
+    backend = FakeBackend("nl", "en")
+    texts = [f"tekst {i:02d}" for i in range(10)]
+    translator = Translator(
+        backend=backend, cache_path=tmp_path / "t.jsonl", max_chars=30
+    )
+    assert translator.translate(texts) == [f"[en] {t}" for t in texts]
+    assert sorted(map(len, backend.calls)) == [1, 3, 3, 3]
+
+
+def test_google_backend_translates_concurrent_batches_correctly(google, tmp_path):
+    texts = [f"tekst {i}" for i in range(40)]
+    translator = Translator(
+        backend=google, cache_path=tmp_path / "t.jsonl", workers=4, max_chars=40
+    )
+    assert translator.translate(texts) == [f"[en] {t}" for t in texts]
+    assert 1 < len(RacyGoogleTranslator.instances) <= 4
+
+
+def test_google_backend_reuses_a_translator_per_thread(google):
+    google.translate_batch(["a"])
+    google.translate_batch(["b"])
+    assert len(RacyGoogleTranslator.instances) == 1
+
+    thread = threading.Thread(target=google.translate_batch, args=(["c"],))
+    thread.start()
+    thread.join()
+    assert len(RacyGoogleTranslator.instances) == 2